@@ -1,10 +1,13 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import TypeVar, Generic, Type, Optional
+from typing import TypeVar, Generic, Type, Optional, List
 from groq import AsyncGroq
+from app.models.embeddings import Document
 from app.services.document_retriever import DocumentRetriever
+from app.services.llm_cache import LLMCache
+from app.services.llm_client import get_instructor_client, get_response_model
 from app.services.prompt_manager import PromptManager
 from app.utils.decorators import handle_errors
-import instructor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,15 +27,17 @@ class BaseAnalyzer(ABC, Generic[T]):
         model: str,
         temperature: float = 0.0,
         document_limit: int = 5,
+        llm_cache: Optional[LLMCache] = None,
     ):
-        # Patch Groq client with Instructor for structured outputs
-        self.client = instructor.from_groq(llm_client)
+        # Shared Instructor wrapper around the pooled Groq client
+        self.client = get_instructor_client(llm_client)
         self.document_retriever = document_retriever
         self.prompt_manager = prompt_manager
         self.config_loader = config_loader
         self.model = model
         self.temperature = temperature
         self.document_limit = document_limit
+        self.llm_cache = llm_cache
 
     @abstractmethod
     async def analyze(self, ticker: str) -> T:
@@ -54,15 +59,48 @@ class BaseAnalyzer(ABC, Generic[T]):
         if temperature is None:
             temperature = self.temperature
 
-        # Use Instructor for clean structured output - no manual JSON prompts needed!
-        return await self.client.chat.completions.create(
-            model=self.model,
-            temperature=temperature,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_content},
-            ],
-            response_model=response_model,  # Instructor handles everything!
+        async def call() -> T:
+            # Use Instructor for clean structured output - no manual JSON prompts needed!
+            return await self.client.chat.completions.create(
+                model=self.model,
+                temperature=temperature,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_content},
+                ],
+                # Wrapped once per model so the schema isn't rebuilt per call
+                response_model=get_response_model(response_model),
+            )
+
+        # Only deterministic calls are safe to serve from cache
+        if self.llm_cache is None or temperature != 0:
+            return await call()
+
+        key = self.llm_cache.make_key(
+            self.model, prompt_name, system_prompt, user_content, response_model
+        )
+        return await self.llm_cache.get_or_call(key, response_model, call)
+
+    async def _retrieve_documents(
+        self,
+        ticker: str,
+        queries: List[str],
+        form_type: str = "10-K",
+        limit: Optional[int] = None,
+    ) -> List[Document]:
+        """Retrieve documents for all queries in one batched search"""
+        # Use instance limit if not specified
+        if limit is None:
+            limit = self.document_limit
+
+        # Retrieval is synchronous (embedding + Qdrant), so run it in a worker
+        # thread; all queries go to Qdrant in a single round trip
+        return await asyncio.to_thread(
+            self.document_retriever.query_documents_batch,
+            queries=queries,
+            ticker=ticker,
+            form_type=form_type,
+            limit=limit,
         )
 
     async def _analyze_section(
@@ -80,8 +118,9 @@ class BaseAnalyzer(ABC, Generic[T]):
         if limit is None:
             limit = self.document_limit
 
-        # Retrieve documents
-        documents = self.document_retriever.query_documents(
+        # Retrieve documents off the event loop
+        documents = await asyncio.to_thread(
+            self.document_retriever.query_documents,
             query=query,
             ticker=ticker,
             form_type=form_type,
@@ -111,8 +150,10 @@ class BaseAnalyzer(ABC, Generic[T]):
         # Get config for this section
         config = self.config_loader.get_analysis_config(analysis_type, section_key)
 
-        # Replace {ticker} placeholder in query if present
-        query = config["query"].format(ticker=ticker)
+        # Replace {ticker} placeholder in query if present (cached per ticker)
+        query = self.config_loader.get_formatted_query(
+            analysis_type, section_key, ticker
+        )
 
         return await self._analyze_section(
             ticker=ticker,
@@ -12,22 +12,17 @@ class FundamentalAnalyzer(BaseAnalyzer[FundamentalAnalysis]):
     @handle_analyzer_errors("Fundamental")
     async def analyze(self, ticker: str) -> FundamentalAnalysis:
         """Execute complete fundamental analysis"""
-        logger.info(f"Starting fundamental analysis for {ticker}")
+        logger.info("Starting fundamental analysis for %s", ticker)
 
         # Get all queries from config
         config = self.config_loader.get_analysis_config("fundamental", "all_sections")
 
-        # Retrieve documents from all relevant sections
-        all_documents = []
-
-        for section_query in config["queries"]:
-            documents = self.document_retriever.query_documents(
-                query=section_query,
-                ticker=ticker,
-                form_type="10-K",
-                limit=self.document_limit,
-            )
-            all_documents.extend(documents)
+        # Retrieve deduplicated documents for all sections in one batched search
+        all_documents = await self._retrieve_documents(
+            ticker=ticker,
+            queries=config["queries"],
+            form_type="10-K",
+        )
 
         # Convert to context
         content = self.document_retriever.documents_to_context(all_documents)
@@ -12,22 +12,17 @@ class MomentumAnalyzer(BaseAnalyzer[MomentumAnalysis]):
     @handle_analyzer_errors("Momentum")
     async def analyze(self, ticker: str) -> MomentumAnalysis:
         """Execute complete momentum analysis"""
-        logger.info(f"Starting momentum analysis for {ticker}")
+        logger.info("Starting momentum analysis for %s", ticker)
 
         # Get all queries from config
         config = self.config_loader.get_analysis_config("momentum", "all_sections")
 
-        # Retrieve documents from all relevant sections
-        all_documents = []
-
-        for section_query in config["queries"]:
-            documents = self.document_retriever.query_documents(
-                query=section_query,
-                ticker=ticker,
-                form_type="10-Q",
-                limit=self.document_limit,
-            )
-            all_documents.extend(documents)
+        # Retrieve documents for all section queries in one batched search
+        all_documents = await self._retrieve_documents(
+            ticker=ticker,
+            queries=config["queries"],
+            form_type="10-Q",
+        )
 
         # Convert to context
         content = self.document_retriever.documents_to_context(all_documents)
@@ -1,3 +1,4 @@
+import asyncio
 from app.analyzers.base_analyzer import BaseAnalyzer
 from app.models.agent import MarketSentiment
 from app.utils.decorators import handle_analyzer_errors
@@ -12,16 +13,19 @@ class SentimentAnalyzer(BaseAnalyzer[MarketSentiment]):
     @handle_analyzer_errors("Sentiment")
     async def analyze(self, ticker: str) -> MarketSentiment:
         """Execute market sentiment analysis from news"""
-        logger.info(f"Starting sentiment analysis for {ticker}")
+        logger.info("Starting sentiment analysis for %s", ticker)
 
         # Get config for sentiment analysis
         config = self.config_loader.get_analysis_config("sentiment", "market_news")
 
-        # Replace {ticker} in query
-        query = config["query"].format(ticker=ticker)
+        # Query with {ticker} filled in (cached per ticker)
+        query = self.config_loader.get_formatted_query(
+            "sentiment", "market_news", ticker
+        )
 
-        # Query recent news
-        documents = self.document_retriever.query_news(
+        # Query recent news off the event loop
+        documents = await asyncio.to_thread(
+            self.document_retriever.query_news,
             query=query,
             ticker=ticker,
             limit=self.document_limit,  # Uses news_search_limit from settings
@@ -1,5 +1,6 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -13,16 +14,32 @@ class Settings(BaseSettings):
     qdrant_api_key: Optional[str] = None
     collection_name: str = "documents"
     qdrant_timeout: float = 60.0
+    qdrant_prefer_grpc: bool = False
     prefetch_limit: int = 25
+    # Dense prefetch over int8 quantized vectors, rescored with the originals
+    quantization_rescore: bool = True
+    quantization_oversampling: float = 2.0
 
     # Model Configuration
     dense_model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
     bm25_model_name: str = "Qdrant/bm25"
     late_interaction_model_name: str = "colbert-ir/colbertv2.0"
+    # Optional cross-encoder rerank, e.g. "Xenova/ms-marco-MiniLM-L-6-v2"
+    rerank_model_name: Optional[str] = None
+    rerank_candidates: int = 20
 
     # Models cache
     embedder_cache_dir: Optional[str] = "/tmp/vector"
     embedder_local_files_only: bool = True
+    embedder_query_cache_size: int = 1024
+    # Load and run the models once at startup; turn off for quick test boots
+    embedder_warmup: bool = True
+    # ONNX Runtime intra-op threads (None = runtime default) and execution providers
+    embedder_threads: Optional[int] = None
+    embedder_providers: Optional[List[str]] = None
+    # Threads running the dense, BM25 and late-interaction models of one query
+    # concurrently; 1 runs them one after another
+    embedder_workers: int = 3
 
     # LLM Configuration
     llm_api_key: Optional[str] = None
@@ -30,13 +47,46 @@ class Settings(BaseSettings):
     llm_temperature: float = 0.0
     llm_max_output_tokens: int = 4096
 
+    # LLM HTTP connection pool (shared by all services)
+    llm_max_connections: int = 64
+    llm_max_keepalive_connections: int = 32
+    llm_timeout: float = 60.0
+    llm_connect_timeout: float = 5.0
+    llm_http2: bool = True
+    # Retries on 429/5xx; the Groq SDK honors retry-after headers with jitter
+    llm_max_retries: int = 4
+
     # Document retrieval settings
     document_search_limit: int = 3
     news_search_limit: int = 3
 
+    # Retrieval result cache (exact query + filter match)
+    retrieval_cache_enabled: bool = True
+    retrieval_cache_size: int = 512
+    retrieval_cache_ttl: int = 300
+    # Optional SQLite file persisting the retrieval cache across restarts
+    retrieval_cache_path: Optional[str] = None
+    # Serve results of a near-identical earlier query (cosine similarity of the
+    # dense vectors, e.g. 0.95); None disables the semantic cache
+    semantic_cache_threshold: Optional[float] = None
+    semantic_cache_size: int = 256
+
     # LLM analysis settings
     analysis_temperature: float = 0.0
     analysis_max_tokens: Optional[int] = None
+    # Per-stream timeout in seconds; a timed-out stream is retried once
+    analysis_stream_timeout: Optional[float] = 120.0
+
+    # LLM response cache (only used for temperature 0 calls)
+    llm_cache_enabled: bool = True
+    llm_cache_size: int = 256
+    llm_cache_ttl: int = 86400
+    llm_cache_redis_url: Optional[str] = None
+
+    # Complete agent response cache, keyed by ticker and model
+    agent_cache_enabled: bool = True
+    agent_cache_size: int = 128
+    agent_cache_ttl: int = 300
 
     # Ticker extraction settings
     ticker_extraction_temperature: float = 0.0
@@ -47,3 +97,9 @@ class Settings(BaseSettings):
     ticker_mappings_path: str = "app/config/ticker_mappings.yaml"
 
     model_config = {"env_file": ".env", "extra": "allow"}
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the application settings, parsed from env/.env once per process"""
+    return Settings()
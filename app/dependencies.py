@@ -0,0 +1,56 @@
+from typing import Optional
+from fastapi import Depends, Request
+from app.config.settings import Settings, get_settings
+from app.services.agent_service import AgentService
+from app.services.document_retriever import get_retrieval_cache
+from app.services.embedder import QueryEmbedder, get_query_embedder_for_settings
+from app.services.llm_service import LLMService
+from app.services.retriever import QdrantRetriever
+from app.utils.cache import LRUCache
+
+# Shared FastAPI dependencies - every provider returns a process-wide instance
+
+
+def get_embedder(settings: Settings = Depends(get_settings)) -> QueryEmbedder:
+    return get_query_embedder_for_settings(settings)
+
+
+def get_retriever(request: Request) -> QdrantRetriever:
+    return request.app.state.retriever
+
+
+def get_retrieval_cache_for_settings(
+    settings: Settings = Depends(get_settings),
+) -> Optional[LRUCache]:
+    if not settings.retrieval_cache_enabled:
+        return None
+    return get_retrieval_cache(
+        maxsize=settings.retrieval_cache_size, ttl=settings.retrieval_cache_ttl
+    )
+
+
+def get_llm_service(
+    request: Request, settings: Settings = Depends(get_settings)
+) -> LLMService:
+    # Built on first use so the API starts without LLM credentials
+    llm_service = getattr(request.app.state, "llm_service", None)
+    if llm_service is None:
+        llm_service = LLMService(settings=settings)
+        request.app.state.llm_service = llm_service
+    return llm_service
+
+
+def get_agent_service(
+    request: Request,
+    embedder: QueryEmbedder = Depends(get_embedder),
+    retriever: QdrantRetriever = Depends(get_retriever),
+    settings: Settings = Depends(get_settings),
+) -> AgentService:
+    # Built on first use since it embeds the static config queries
+    agent_service = getattr(request.app.state, "agent_service", None)
+    if agent_service is None:
+        agent_service = AgentService(
+            embedder=embedder, retriever=retriever, settings=settings
+        )
+        request.app.state.agent_service = agent_service
+    return agent_service
@@ -1,6 +1,12 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.config.settings import Settings
+from app.config.settings import get_settings
+from app.services.config_loader import get_config_loader
+from app.services.embedder import get_query_embedder_for_settings, get_reranker
+from app.services.llm_client import close_llm_clients
+from app.services.prompt_manager import PROMPTS_DIR, get_prompt_manager
+from app.services.retriever import QdrantRetriever
 from app.routers.search import router as search_router
 from app.routers.llm import router as llm_router
 from app.routers.agent import router as agent_router
@@ -13,8 +19,42 @@ logging.basicConfig(
 )
 
 
-def get_settings():
-    return Settings()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+
+    # One Qdrant client (and connection pool) shared by all requests
+    app.state.retriever = QdrantRetriever(settings=settings)
+
+    # Parse the YAML configs now so the first request doesn't pay for it
+    get_config_loader(
+        queries_path=settings.queries_config_path,
+        ticker_mappings_path=settings.ticker_mappings_path,
+    )
+
+    # Read every prompt template now instead of on first use
+    get_prompt_manager(PROMPTS_DIR)
+
+    # Load and warm the shared embedding models before serving requests
+    if settings.embedder_warmup:
+        try:
+            get_query_embedder_for_settings(settings).warmup()
+            if settings.rerank_model_name:
+                reranker = get_reranker(
+                    settings.rerank_model_name,
+                    cache_dir=settings.embedder_cache_dir,
+                    local_files_only=settings.embedder_local_files_only,
+                )
+                list(reranker.rerank("warmup", ["warmup"]))
+            logging.info("Query embedder loaded and warmed up")
+        except Exception as e:
+            logging.warning(f"Query embedder warmup failed: {str(e)}")
+
+    yield
+
+    app.state.retriever.close()
+    # Release the pooled keep-alive connections to the LLM API
+    await close_llm_clients()
 
 
 def create_application():
@@ -26,6 +66,7 @@ def create_application():
         title=settings.api_title,
         description=settings.api_description,
         version=settings.api_version,
+        lifespan=lifespan,
     )
 
     app.add_middleware(
@@ -1,43 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from app.models.agent import AgentRequest, AgentResponse
 from app.services.agent_service import AgentService
-from app.services.retriever import QdrantRetriever
-from app.services.embedder import QueryEmbedder
-from app.config.settings import Settings
+from app.dependencies import get_agent_service
 
 import logging
+from typing import AsyncGenerator
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
 
-def get_settings():
-    return Settings()
-
-
-def get_embedder(settings: Settings = Depends(get_settings)):
-    return QueryEmbedder(
-        dense_model_name=settings.dense_model_name,
-        bm25_model_name=settings.bm25_model_name,
-        late_interaction_model_name=settings.late_interaction_model_name,
-        cache_dir=settings.embedder_cache_dir,
-        local_files_only=settings.embedder_local_files_only,
-    )
-
-
-def get_retriever(settings: Settings = Depends(get_settings)):
-    return QdrantRetriever(settings=settings)
-
-
-def get_agent_service(
-    embedder: QueryEmbedder = Depends(get_embedder),
-    retriever: QdrantRetriever = Depends(get_retriever),
-    settings: Settings = Depends(get_settings),
-):
-    return AgentService(embedder=embedder, retriever=retriever, settings=settings)
-
-
 @router.post("", response_model=AgentResponse)
 async def analyze_investment(
     request: AgentRequest,
@@ -63,7 +37,9 @@ async def analyze_investment(
         )
 
         logger.info(
-            f"Completed investment analysis for {result.ticker} in {result.execution_time:.2f}s"
+            "Completed investment analysis for %s in %.2fs",
+            result.ticker,
+            result.execution_time,
         )
         return result
 
@@ -74,3 +50,42 @@ async def analyze_investment(
         raise HTTPException(
             status_code=500, detail=f"Investment analysis failed: {str(e)}"
         )
+
+
+# Stream API
+@router.post("/stream")
+async def stream_investment_analysis(
+    request: AgentRequest,
+    agent_service: AgentService = Depends(get_agent_service),
+):
+    """
+    Run the same analysis as POST /agent as Server-Sent Events:
+    - ticker: the resolved ticker symbol
+    - analysis: one per stream as it finishes, with its response field name
+      (fundamental_analysis, momentum_analysis, market_sentiment) in stream
+    - analyses: the 3 stream results once they complete
+    - recommendation_delta: partial final recommendation as it is generated
+    - agent_response: the complete response, then stream_completed
+    - error: failure message, ending the stream
+    """
+    if not request.ticker and not request.message:
+        raise HTTPException(
+            status_code=400, detail="Either ticker or message must be provided"
+        )
+
+    async def event_generator() -> AsyncGenerator[str, None]:
+        async for event in agent_service.stream_investment_analysis(
+            ticker=request.ticker,
+            message=request.message,
+        ):
+            yield f"data: {event}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",  # Disable Nginx buffering
+        },
+    )
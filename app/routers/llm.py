@@ -1,40 +1,60 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from app.models.api import LLMRequest, LLMResponse
+from app.models.embeddings import Document
 from app.services.retriever import QdrantRetriever
 from app.services.embedder import QueryEmbedder
 from app.services.llm_service import LLMService
-from app.config.settings import Settings
+from app.utils.cache import LRUCache
+from app.dependencies import (
+    get_embedder,
+    get_retriever,
+    get_llm_service,
+    get_retrieval_cache_for_settings,
+)
 
 import logging
-import json
-from typing import AsyncGenerator
+import orjson
+from typing import AsyncGenerator, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/llm", tags=["llm"])
 
-
-def get_settings():
-    return Settings()
-
-
-def get_embedder(settings: Settings = Depends(get_settings)):
-    return QueryEmbedder(
-        dense_model_name=settings.dense_model_name,
-        bm25_model_name=settings.bm25_model_name,
-        late_interaction_model_name=settings.late_interaction_model_name,
-        cache_dir=settings.embedder_cache_dir,
-        local_files_only=settings.embedder_local_files_only,
+_STREAM_COMPLETED_EVENT = (
+    "data: " + orjson.dumps({"type": "stream_completed"}).decode() + "\n\n"
+)
+
+
+async def _retrieve(
+    query: str,
+    limit: int,
+    filters: Optional[Dict[str, str]],
+    embedder: QueryEmbedder,
+    retriever: QdrantRetriever,
+    cache: Optional[LRUCache] = None,
+) -> List[Document]:
+    """Embed query and search Qdrant, reusing a recent result for the same request"""
+    key = ("llm", query, limit, tuple(sorted((filters or {}).items())))
+    if cache is not None:
+        documents = cache.get(key)
+        if documents is not None:
+            return list(documents)
+
+    query_embeddings = await asyncio.to_thread(embedder.embed_query, query)
+    documents = await asyncio.to_thread(
+        retriever.search_documents,
+        embeddings=query_embeddings,
+        limit=limit,
+        filters=filters,
     )
 
-
-def get_retriever(settings: Settings = Depends(get_settings)):
-    return QdrantRetriever(settings=settings)
-
-
-def get_llm_service(settings: Settings = Depends(get_settings)):
-    return LLMService(settings=settings)
+    if not documents:
+        logger.warning("No relevant documents found for query", extra={"query": query})
+    elif cache is not None:
+        cache.set(key, list(documents))
+    return documents
 
 
 @router.post("", response_model=LLMResponse)
@@ -43,19 +63,13 @@ async def generate_llm_response(
     embedder: QueryEmbedder = Depends(get_embedder),
     retriever: QdrantRetriever = Depends(get_retriever),
     llm_service: LLMService = Depends(get_llm_service),
+    cache: Optional[LRUCache] = Depends(get_retrieval_cache_for_settings),
 ):
     try:
-        query_embeddings = embedder.embed_query(request.query)
-
-        context_documents = retriever.search_documents(
-            embeddings=query_embeddings, limit=request.limit, filters=request.filters
+        context_documents = await _retrieve(
+            request.query, request.limit, request.filters, embedder, retriever, cache
         )
 
-        if not context_documents:
-            logger.warning(
-                "No relevant documents found for query", extra={"query": request.query}
-            )
-
         answer = await llm_service.generate_response(
             query=request.query,
             context_documents=context_documents,
@@ -80,23 +94,25 @@ async def generate_llm_stream_response(  # Renamed function
     embedder: QueryEmbedder = Depends(get_embedder),
     retriever: QdrantRetriever = Depends(get_retriever),
     llm_service: LLMService = Depends(get_llm_service),  # Updated service
+    cache: Optional[LRUCache] = Depends(get_retrieval_cache_for_settings),
 ):
     try:
-        query_embeddings = embedder.embed_query(request.query)
-
-        context_documents = retriever.search_documents(
-            embeddings=query_embeddings, limit=request.limit
+        context_documents = await _retrieve(
+            request.query, request.limit, request.filters, embedder, retriever, cache
         )
 
-        if not context_documents:
-            logger.warning(
-                "No relevant documents found for query", extra={"query": request.query}
-            )
+        # Serialized once, before streaming starts
+        source_documents_event = orjson.dumps(
+            {
+                "type": "source_documents",
+                "documents": [doc.model_dump(mode="json") for doc in context_documents],
+            }
+        ).decode()
 
         async def event_generator() -> AsyncGenerator[str, None]:
             try:
                 # First, send the source documents
-                yield f"data: {json.dumps({'type': 'source_documents', 'documents': [doc.model_dump() for doc in context_documents]})}\n\n"
+                yield f"data: {source_documents_event}\n\n"
 
                 # Then stream the response
                 async for (
@@ -111,14 +127,14 @@ async def generate_llm_stream_response(  # Renamed function
                     yield f"data: {chunk}\n\n"
 
                 # Send completion event
-                yield f"data: {json.dumps({'type': 'stream_completed'})}\n\n"
+                yield _STREAM_COMPLETED_EVENT
 
             except Exception as e:
                 logger.error(
                     "Stream generation failed",
                     extra={"error": str(e), "query": request.query},
                 )
-                yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+                yield f"data: {orjson.dumps({'type': 'error', 'message': str(e)}).decode()}\n\n"
 
         return StreamingResponse(
             event_generator(),
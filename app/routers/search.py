@@ -1,30 +1,13 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
 from app.models.api import SearchRequest, SearchResponse
 from app.services.retriever import QdrantRetriever
 from app.services.embedder import QueryEmbedder
-from app.config.settings import Settings
+from app.dependencies import get_embedder, get_retriever
 
 router = APIRouter(prefix="/search", tags=["search"])
 
 
-def get_settings():
-    return Settings()
-
-
-def get_embedder(settings: Settings = Depends(get_settings)):
-    return QueryEmbedder(
-        dense_model_name=settings.dense_model_name,
-        bm25_model_name=settings.bm25_model_name,
-        late_interaction_model_name=settings.late_interaction_model_name,
-        cache_dir=settings.embedder_cache_dir,
-        local_files_only=settings.embedder_local_files_only,
-    )
-
-
-def get_retriever(settings: Settings = Depends(get_settings)):
-    return QdrantRetriever(settings=settings)
-
-
 @router.post("", response_model=SearchResponse)
 async def search_documents(
     request: SearchRequest,
@@ -33,11 +16,14 @@ async def search_documents(
 ):
     try:
         # Generate embeddings for the query
-        query_embeddings = embedder.embed_query(request.query)
+        query_embeddings = await asyncio.to_thread(embedder.embed_query, request.query)
 
         # Search documents using the generated embeddings
-        results = retriever.search_documents(
-            embeddings=query_embeddings, limit=request.limit, filters=request.filters
+        results = await asyncio.to_thread(
+            retriever.search_documents,
+            embeddings=query_embeddings,
+            limit=request.limit,
+            filters=request.filters,
         )
 
         return SearchResponse(results=results)
@@ -1,18 +1,30 @@
 import time
+import json
 import asyncio
-import instructor
-from typing import Optional
-from pathlib import Path
-
-from groq import AsyncGroq
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
 
 from app.config.settings import Settings
-from app.services.embedder import QueryEmbedder
+from app.services.embedder import (
+    QueryEmbedder,
+    get_precomputed_embeddings,
+    get_reranker,
+)
 from app.services.retriever import QdrantRetriever
 from app.services.ticker_extractor import TickerExtractor
-from app.services.document_retriever import DocumentRetriever
-from app.services.prompt_manager import PromptManager
-from app.services.config_loader import ConfigLoader
+from app.services.document_retriever import (
+    DocumentRetriever,
+    get_retrieval_cache,
+    get_retrieval_store,
+    get_semantic_cache,
+)
+from app.services.prompt_manager import PROMPTS_DIR, get_prompt_manager
+from app.services.config_loader import get_config_loader
+from app.services.llm_cache import get_llm_cache
+from app.services.llm_client import (
+    get_instructor_client,
+    get_llm_client_for_settings,
+    get_response_model,
+)
 
 from app.analyzers import (
     FundamentalAnalyzer,
@@ -27,6 +39,7 @@ from app.models.agent import (
     FinalRecommendation,
     AgentResponse,
 )
+from app.utils.cache import LRUCache
 from app.utils.decorators import handle_errors
 
 import logging
@@ -34,29 +47,46 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+# AgentResponse field holding each stream's result
+_STREAM_FIELDS = {
+    "fundamental_stream": "fundamental_analysis",
+    "momentum_stream": "momentum_analysis",
+    "sentiment_stream": "market_sentiment",
+}
+
+
 class AgentService:
     """Investment Analysis Agent Service - Orchestrates all analysis streams"""
 
     def __init__(
         self, embedder: QueryEmbedder, retriever: QdrantRetriever, settings: Settings
     ):
-        # Initialize LLM client and patch with Instructor
-        base_client = AsyncGroq(api_key=settings.llm_api_key)
-        self.client = instructor.from_groq(base_client)
+        # Get the shared LLM client and patch with Instructor
+        base_client = get_llm_client_for_settings(settings)
+        self.client = get_instructor_client(base_client)
         self.model = settings.llm_model
+        self.stream_timeout = settings.analysis_stream_timeout
+
+        # Recent complete analyses, stored as JSON; None disables the cache
+        self.response_cache: Optional[LRUCache[tuple, str]] = None
+        if settings.agent_cache_enabled:
+            self.response_cache = LRUCache(
+                maxsize=settings.agent_cache_size, ttl=settings.agent_cache_ttl
+            )
 
-        # Initialize services
-        prompts_dir = Path(__file__).parent.parent / "prompts"
-        self.prompt_manager = PromptManager(prompts_dir)
+        # Shared services - prompts and configs are loaded once per process
+        self.prompt_manager = get_prompt_manager(PROMPTS_DIR)
+        self._final_recommendation_prompt = self.prompt_manager.get_prompt(
+            "final_recommendation"
+        )
 
-        # Initialize config loader
-        self.config_loader = ConfigLoader(
+        self.config_loader = get_config_loader(
             queries_path=settings.queries_config_path,
             ticker_mappings_path=settings.ticker_mappings_path,
         )
 
         self.ticker_extractor = TickerExtractor(
-            llm_api_key=settings.llm_api_key,
+            llm_client=base_client,
             model=self.model,
             prompt_manager=self.prompt_manager,
             config_loader=self.config_loader,
@@ -64,37 +94,92 @@ class AgentService:
             max_tokens=settings.ticker_extraction_max_tokens,
         )
 
-        self.document_retriever = DocumentRetriever(embedder, retriever)
+        reranker = None
+        if settings.rerank_model_name:
+            reranker = get_reranker(
+                settings.rerank_model_name,
+                cache_dir=settings.embedder_cache_dir,
+                local_files_only=settings.embedder_local_files_only,
+            )
+        # Shared process-wide cache of retrieval results
+        retrieval_cache = None
+        if settings.retrieval_cache_enabled:
+            retrieval_cache = get_retrieval_cache(
+                maxsize=settings.retrieval_cache_size,
+                ttl=settings.retrieval_cache_ttl,
+            )
+
+        retrieval_store = None
+        if settings.retrieval_cache_enabled and settings.retrieval_cache_path:
+            retrieval_store = get_retrieval_store(
+                settings.retrieval_cache_path, ttl=settings.retrieval_cache_ttl
+            )
+
+        semantic_cache = None
+        if settings.retrieval_cache_enabled and settings.semantic_cache_threshold:
+            semantic_cache = get_semantic_cache(
+                settings.semantic_cache_threshold,
+                maxsize=settings.semantic_cache_size,
+                ttl=settings.retrieval_cache_ttl,
+            )
+
+        # Static config queries are embedded once per process, not per request
+        precomputed_embeddings = get_precomputed_embeddings(
+            embedder, tuple(self.config_loader.get_static_queries())
+        )
+
+        self.document_retriever = DocumentRetriever(
+            embedder,
+            retriever,
+            reranker=reranker,
+            rerank_candidates=settings.rerank_candidates,
+            cache=retrieval_cache,
+            precomputed_embeddings=precomputed_embeddings,
+            store=retrieval_store,
+            semantic_cache=semantic_cache,
+        )
+
+        # Shared process-wide cache for deterministic analyzer calls
+        llm_cache = None
+        if settings.llm_cache_enabled:
+            llm_cache = get_llm_cache(
+                maxsize=settings.llm_cache_size,
+                ttl=settings.llm_cache_ttl,
+                redis_url=settings.llm_cache_redis_url,
+            )
 
         # Initialize analyzers with Instructor-patched client
         self.fundamental_analyzer = FundamentalAnalyzer(
-            llm_client=base_client,  # Pass base client, will be patched in BaseAnalyzer
+            llm_client=base_client,  # Same Instructor wrapper as self.client
             document_retriever=self.document_retriever,
             prompt_manager=self.prompt_manager,
             config_loader=self.config_loader,
             model=self.model,
             temperature=settings.analysis_temperature,
             document_limit=settings.document_search_limit,
+            llm_cache=llm_cache,
         )
 
         self.momentum_analyzer = MomentumAnalyzer(
-            llm_client=base_client,  # Pass base client, will be patched in BaseAnalyzer
+            llm_client=base_client,  # Same Instructor wrapper as self.client
             document_retriever=self.document_retriever,
             prompt_manager=self.prompt_manager,
             config_loader=self.config_loader,
             model=self.model,
             temperature=settings.analysis_temperature,
             document_limit=settings.document_search_limit,
+            llm_cache=llm_cache,
         )
 
         self.sentiment_analyzer = SentimentAnalyzer(
-            llm_client=base_client,  # Pass base client, will be patched in BaseAnalyzer
+            llm_client=base_client,  # Same Instructor wrapper as self.client
             document_retriever=self.document_retriever,
             prompt_manager=self.prompt_manager,
             config_loader=self.config_loader,
             model=self.model,
             temperature=settings.analysis_temperature,
             document_limit=settings.news_search_limit,
+            llm_cache=llm_cache,
         )
 
     @handle_errors("Investment analysis")
@@ -106,42 +191,249 @@ class AgentService:
         """Run complete investment analysis with all 3 streams + aggregation"""
         start_time = time.time()
 
+        ticker = await self._resolve_ticker(ticker, message)
+
+        cached = self._get_cached_response(ticker, start_time)
+        if cached is not None:
+            return cached
+
+        logger.info("Starting complete investment analysis for %s", ticker)
+
+        # Execute all 3 streams in parallel; a failed stream doesn't discard the others
+        stream1_result, stream2_result, stream3_result = await self._run_streams(ticker)
+
+        # Run final aggregation
+        final_recommendation = await self._aggregate_analyses(
+            ticker, stream1_result, stream2_result, stream3_result
+        )
+
+        return self._build_response(
+            ticker,
+            start_time,
+            stream1_result,
+            stream2_result,
+            stream3_result,
+            final_recommendation,
+        )
+
+    async def stream_investment_analysis(
+        self,
+        ticker: Optional[str] = None,
+        message: Optional[str] = None,
+    ) -> AsyncGenerator[str, None]:
+        """Run the analysis, yielding JSON events as results become available"""
+        start_time = time.time()
+
+        try:
+            ticker = await self._resolve_ticker(ticker, message)
+            yield json.dumps({"type": "ticker", "ticker": ticker})
+
+            cached = self._get_cached_response(ticker, start_time)
+            if cached is not None:
+                yield json.dumps(
+                    {"type": "agent_response", "data": cached.model_dump()}
+                )
+                yield json.dumps({"type": "stream_completed"})
+                return
+
+            logger.info("Starting streamed investment analysis for %s", ticker)
+
+            # Forward each stream's result as soon as it finishes
+            completed: asyncio.Queue = asyncio.Queue()
+            streams_task = asyncio.create_task(
+                self._run_streams(
+                    ticker,
+                    on_complete=lambda name, result: completed.put_nowait(
+                        (name, result)
+                    ),
+                )
+            )
+            streams_task.add_done_callback(lambda _: completed.put_nowait(None))
+            try:
+                while (item := await completed.get()) is not None:
+                    name, result = item
+                    yield json.dumps(
+                        {
+                            "type": "analysis",
+                            "stream": _STREAM_FIELDS[name],
+                            "data": result.model_dump(),
+                        }
+                    )
+                stream1_result, stream2_result, stream3_result = await streams_task
+            finally:
+                # Client went away mid-stream - don't leave the analyzers running
+                if not streams_task.done():
+                    streams_task.cancel()
+
+            yield json.dumps(
+                {
+                    "type": "analyses",
+                    "fundamental_analysis": stream1_result.model_dump(),
+                    "momentum_analysis": stream2_result.model_dump(),
+                    "market_sentiment": stream3_result.model_dump(),
+                }
+            )
+
+            # Stream the recommendation fields as the LLM generates them
+            partial_recommendation = None
+            async for partial_recommendation in self.client.create_partial(
+                model=self.model,
+                temperature=0,
+                messages=self._aggregation_messages(
+                    ticker, stream1_result, stream2_result, stream3_result
+                ),
+                response_model=FinalRecommendation,
+            ):
+                yield json.dumps(
+                    {
+                        "type": "recommendation_delta",
+                        "data": partial_recommendation.model_dump(),
+                    }
+                )
+
+            if partial_recommendation is None:
+                raise Exception("Final aggregation returned no content")
+
+            # The last partial is complete - validate it as the real model
+            final_recommendation = FinalRecommendation.model_validate(
+                partial_recommendation.model_dump()
+            )
+
+            response = self._build_response(
+                ticker,
+                start_time,
+                stream1_result,
+                stream2_result,
+                stream3_result,
+                final_recommendation,
+            )
+            yield json.dumps({"type": "agent_response", "data": response.model_dump()})
+            yield json.dumps({"type": "stream_completed"})
+
+        except Exception as e:
+            logger.error(f"Streamed investment analysis failed: {str(e)}")
+            yield json.dumps({"type": "error", "message": str(e)})
+
+    async def _resolve_ticker(
+        self, ticker: Optional[str], message: Optional[str]
+    ) -> str:
+        """Use the given ticker or extract one from the message"""
+        ticker = ticker.strip() if ticker else ticker
+
         # Extract ticker if not provided directly
         if not ticker and message:
             ticker = await self.ticker_extractor.extract_ticker(message)
 
         if not ticker:
             raise ValueError("Could not determine ticker symbol from input")
+        # Qdrant metadata filters and the response cache match it exactly
+        return ticker.strip().upper()
 
-        logger.info(f"Starting complete investment analysis for {ticker}")
+    def _get_cached_response(
+        self, ticker: str, start_time: float
+    ) -> Optional[AgentResponse]:
+        """Return a recent analysis for ticker, if one is cached"""
+        if self.response_cache is None:
+            return None
 
-        # Execute all 3 streams in parallel
-        stream1_result, stream2_result, stream3_result = await asyncio.gather(
-            self.fundamental_analyzer.analyze(ticker),
-            self.momentum_analyzer.analyze(ticker),
-            self.sentiment_analyzer.analyze(ticker),
-        )
+        cached = self.response_cache.get((ticker, self.model))
+        if cached is None:
+            return None
 
-        # Run final aggregation
-        final_recommendation = await self._aggregate_analyses(
-            ticker, stream1_result, stream2_result, stream3_result
+        logger.info("Serving cached investment analysis for %s", ticker)
+        return AgentResponse.model_validate_json(cached).model_copy(
+            update={"execution_time": time.time() - start_time}
         )
 
+    def _build_response(
+        self,
+        ticker: str,
+        start_time: float,
+        fundamental_analysis: FundamentalAnalysis,
+        momentum_analysis: MomentumAnalysis,
+        market_sentiment: MarketSentiment,
+        final_recommendation: FinalRecommendation,
+    ) -> AgentResponse:
+        """Assemble the complete response and remember it for repeat requests"""
         execution_time = time.time() - start_time
 
         logger.info(
-            f"Completed investment analysis for {ticker} in {execution_time:.2f}s"
+            "Completed investment analysis for %s in %.2fs", ticker, execution_time
         )
 
-        return AgentResponse(
+        response = AgentResponse(
             ticker=ticker,
             execution_time=execution_time,
-            fundamental_analysis=stream1_result,
-            momentum_analysis=stream2_result,
-            market_sentiment=stream3_result,
+            fundamental_analysis=fundamental_analysis,
+            momentum_analysis=momentum_analysis,
+            market_sentiment=market_sentiment,
             final_recommendation=final_recommendation,
         )
 
+        if self.response_cache is not None:
+            self.response_cache.set((ticker, self.model), response.model_dump_json())
+        return response
+
+    async def _run_streams(
+        self,
+        ticker: str,
+        on_complete: Optional[Callable[[str, Any], None]] = None,
+    ) -> tuple:
+        """
+        Run the 3 streams concurrently, retrying failed or timed-out streams once
+
+        on_complete, if given, is called with each stream's name and result as
+        soon as that stream succeeds, before the slower streams finish.
+        """
+        streams = {
+            "fundamental_stream": self.fundamental_analyzer.analyze,
+            "momentum_stream": self.momentum_analyzer.analyze,
+            "sentiment_stream": self.sentiment_analyzer.analyze,
+        }
+        results = dict.fromkeys(streams)
+        pending = list(streams)
+
+        async def run(name: str):
+            result = await asyncio.wait_for(
+                streams[name](ticker), timeout=self.stream_timeout
+            )
+            if on_complete is not None:
+                on_complete(name, result)
+            return result
+
+        for attempt in range(2):
+            # Named tasks let profilers attribute await time to each stream
+            outcomes = await asyncio.gather(
+                *(asyncio.create_task(run(name), name=name) for name in pending),
+                return_exceptions=True,
+            )
+
+            failed = []
+            for name, outcome in zip(pending, outcomes):
+                if isinstance(outcome, asyncio.CancelledError):
+                    raise outcome
+                if isinstance(outcome, asyncio.TimeoutError):
+                    outcome = Exception(
+                        f"{name} timed out after {self.stream_timeout}s"
+                    )
+                if isinstance(outcome, BaseException):
+                    failed.append((name, outcome))
+                else:
+                    results[name] = outcome
+
+            if not failed:
+                return tuple(results.values())
+
+            if attempt == 0:
+                logger.warning(
+                    f"Retrying failed streams for {ticker}: "
+                    f"{', '.join(name for name, _ in failed)}"
+                )
+            pending = [name for name, _ in failed]
+
+        # Still failing after the retry - surface the first error
+        raise failed[0][1]
+
     @handle_errors("Final aggregation")
     async def _aggregate_analyses(
         self,
@@ -151,28 +443,39 @@ class AgentService:
         market_sentiment: MarketSentiment,
     ) -> FinalRecommendation:
         """Aggregate all three streams into final recommendation"""
-        logger.info(f"Starting final aggregation for {ticker}")
-
-        aggregation_input = f"""
-        STREAM 1 - FUNDAMENTAL ANALYSIS for {ticker}:
-        {fundamental_analysis.model_dump()}
-        
-        STREAM 2 - MOMENTUM ANALYSIS for {ticker}:
-        {momentum_analysis.model_dump()}
-        
-        STREAM 3 - MARKET SENTIMENT for {ticker}:
-        {market_sentiment.model_dump()}
-        """
-
-        system_prompt = self.prompt_manager.get_prompt("final_recommendation")
+        logger.info("Starting final aggregation for %s", ticker)
 
         # Use Instructor for clean structured output - no manual JSON prompts needed!
         return await self.client.chat.completions.create(
             model=self.model,
             temperature=0,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": aggregation_input},
-            ],
-            response_model=FinalRecommendation,  # Instructor handles everything!
+            messages=self._aggregation_messages(
+                ticker, fundamental_analysis, momentum_analysis, market_sentiment
+            ),
+            response_model=get_response_model(FinalRecommendation),
         )
+
+    def _aggregation_messages(
+        self,
+        ticker: str,
+        fundamental_analysis: FundamentalAnalysis,
+        momentum_analysis: MomentumAnalysis,
+        market_sentiment: MarketSentiment,
+    ) -> List[Dict[str, str]]:
+        """Build the final recommendation prompt from the three stream results"""
+        # One join over the stream JSON - no indentation whitespace sent as tokens
+        aggregation_input = "\n\n".join(
+            [
+                f"STREAM 1 - FUNDAMENTAL ANALYSIS for {ticker}:\n"
+                + fundamental_analysis.model_dump_json(),
+                f"STREAM 2 - MOMENTUM ANALYSIS for {ticker}:\n"
+                + momentum_analysis.model_dump_json(),
+                f"STREAM 3 - MARKET SENTIMENT for {ticker}:\n"
+                + market_sentiment.model_dump_json(),
+            ]
+        )
+
+        return [
+            {"role": "system", "content": self._final_recommendation_prompt},
+            {"role": "user", "content": aggregation_input},
+        ]
@@ -1,10 +1,18 @@
+import re
 import yaml
+import functools
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, FrozenSet, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Prefer the libyaml C loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 
 class ConfigLoader:
     """Service responsible for loading and caching configuration files"""
@@ -16,12 +24,15 @@ class ConfigLoader:
         # Cache for loaded configs
         self._queries_cache: Optional[Dict[str, Any]] = None
         self._ticker_mappings_cache: Optional[Dict[str, str]] = None
+        self._company_pattern: Optional[re.Pattern] = None
+        self._company_tickers: Dict[str, str] = {}
+        self._known_tickers: Optional[FrozenSet[str]] = None
 
     def get_queries(self) -> Dict[str, Any]:
         """Load and cache queries configuration"""
         if self._queries_cache is None:
             self._queries_cache = self._load_yaml(self.queries_path)
-            logger.info(f"Loaded queries configuration from {self.queries_path}")
+            logger.info("Loaded queries configuration from %s", self.queries_path)
         return self._queries_cache
 
     def get_ticker_mappings(self) -> Dict[str, str]:
@@ -29,9 +40,40 @@ class ConfigLoader:
         if self._ticker_mappings_cache is None:
             config = self._load_yaml(self.ticker_mappings_path)
             self._ticker_mappings_cache = config.get("company_ticker_mappings", {})
-            logger.info(f"Loaded ticker mappings from {self.ticker_mappings_path}")
+            logger.info("Loaded ticker mappings from %s", self.ticker_mappings_path)
         return self._ticker_mappings_cache
 
+    def get_known_tickers(self) -> FrozenSet[str]:
+        """Return the set of ticker symbols appearing in the mappings"""
+        if self._known_tickers is None:
+            self._known_tickers = frozenset(
+                str(ticker).upper() for ticker in self.get_ticker_mappings().values()
+            )
+        return self._known_tickers
+
+    def find_ticker(self, message: str) -> Optional[str]:
+        """Return the ticker of the first mapped company named in message"""
+        if self._company_pattern is None:
+            self._build_company_pattern()
+        if not self._company_tickers:
+            return None
+
+        match = self._company_pattern.search(message.lower())
+        if match is None:
+            return None
+        return self._company_tickers[match.group(0)]
+
+    def _build_company_pattern(self) -> None:
+        """Compile every mapped company name into one alternation"""
+        company_tickers: Dict[str, str] = {}
+        for company, ticker in self.get_ticker_mappings().items():
+            company_tickers.setdefault(str(company).lower(), ticker)
+
+        # Longest names first so "apple inc" wins over "apple" at the same spot
+        names = sorted(company_tickers, key=len, reverse=True)
+        self._company_tickers = company_tickers
+        self._company_pattern = re.compile("|".join(map(re.escape, names)))
+
     def get_analysis_config(self, analysis_type: str, section: str) -> Dict[str, str]:
         """Get configuration for a specific analysis section"""
         queries = self.get_queries()
@@ -47,14 +89,29 @@ class ConfigLoader:
 
         return analysis_queries[analysis_type][section]
 
+    def get_formatted_query(self, analysis_type: str, section: str, ticker: str) -> str:
+        """Get a section's query with {ticker} filled in"""
+        config = self.get_analysis_config(analysis_type, section)
+        return config["query"].format(ticker=ticker)
+
+    def get_static_queries(self) -> List[str]:
+        """List every configured query that has no placeholders to fill in"""
+        static_queries = []
+        for sections in self.get_queries().get("analysis_queries", {}).values():
+            for config in sections.values():
+                queries = config.get("queries", [])
+                if "query" in config:
+                    queries = [*queries, config["query"]]
+                static_queries.extend(q for q in queries if "{" not in q)
+        return list(dict.fromkeys(static_queries))
+
     def _load_yaml(self, path: Path) -> Dict[str, Any]:
         """Load YAML file"""
-        if not path.exists():
-            raise FileNotFoundError(f"Configuration file not found: {path}")
-
         try:
             with open(path, "r", encoding="utf-8") as f:
-                return yaml.safe_load(f)
+                return yaml.load(f, Loader=SafeLoader)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Configuration file not found: {path}") from None
         except Exception as e:
             logger.error(f"Failed to load YAML file {path}: {e}")
             raise
@@ -63,4 +120,17 @@ class ConfigLoader:
         """Force reload all configurations"""
         self._queries_cache = None
         self._ticker_mappings_cache = None
+        self._company_pattern = None
+        self._known_tickers = None
         logger.info("Cleared configuration cache")
+
+
+@functools.lru_cache(maxsize=None)
+def get_config_loader(queries_path: str, ticker_mappings_path: str) -> ConfigLoader:
+    """Return the process-wide config loader with its YAML files loaded"""
+    config_loader = ConfigLoader(queries_path, ticker_mappings_path)
+    config_loader.get_queries()
+    config_loader.get_ticker_mappings()
+    # Compile the company-name pattern now rather than on the first extraction
+    config_loader._build_company_pattern()
+    return config_loader
@@ -1,33 +1,81 @@
-from typing import List
-from app.models.embeddings import Document
+import functools
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, List, Optional
+from fastembed.rerank.cross_encoder import TextCrossEncoder
+from pydantic import TypeAdapter
+from app.models.embeddings import Document, QueryEmbeddings
 from app.services.embedder import QueryEmbedder
 from app.services.retriever import QdrantRetriever
+from app.utils.cache import LRUCache, SemanticCache, SQLiteCache
 import logging
 
 logger = logging.getLogger(__name__)
 
+_documents_adapter = TypeAdapter(List[Document])
+
+# Header line opening the news context
+_NEWS_HEADER = "\n" + "=" * 50
+
 
 class DocumentRetriever:
     """Service responsible for retrieving documents from Qdrant"""
 
-    def __init__(self, embedder: QueryEmbedder, retriever: QdrantRetriever):
+    def __init__(
+        self,
+        embedder: QueryEmbedder,
+        retriever: QdrantRetriever,
+        reranker: Optional[TextCrossEncoder] = None,
+        rerank_candidates: int = 20,
+        cache: Optional[LRUCache] = None,
+        precomputed_embeddings: Optional[Dict[str, QueryEmbeddings]] = None,
+        store: Optional[SQLiteCache] = None,
+        semantic_cache: Optional[SemanticCache[List[Document]]] = None,
+    ):
         self.embedder = embedder
+        self.precomputed_embeddings = precomputed_embeddings or {}
         self.retriever = retriever
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.cache = cache
+        self.store = store
+        self.semantic_cache = semantic_cache
+
+        # Retrievals currently running, shared by callers asking for the same key
+        self._inflight: Dict[Hashable, Future] = {}
+        self._inflight_lock = threading.Lock()
 
     def query_documents(
         self, query: str, ticker: str, form_type: str = "10-K", limit: int = 5
     ) -> List[Document]:
         """Query SEC documents using embeddings"""
+        return self._cached(
+            ("documents", query, ticker, form_type, limit),
+            lambda: self._query_documents(query, ticker, form_type, limit),
+        )
+
+    def _query_documents(
+        self, query: str, ticker: str, form_type: str, limit: int
+    ) -> List[Document]:
         try:
-            query_embeddings = self.embedder.embed_query(query)
+            query_embeddings = self._embed(query)
+            scope = ("documents", ticker, form_type, limit)
+            documents = self._semantic_get(scope, query_embeddings)
+            if documents is not None:
+                return documents
+
             documents = self.retriever.search_documents(
                 embeddings=query_embeddings,
                 filters={"ticker": ticker, "formType": form_type},
-                limit=limit,
+                limit=self._search_limit(limit),
             )
+            documents = self._rerank(query, documents, limit)
+            self._semantic_set(scope, query_embeddings, documents)
 
             logger.info(
-                f"Retrieved {len(documents)} documents for {ticker} ({form_type})"
+                "Retrieved %d documents for %s (%s)", len(documents), ticker, form_type
             )
             return documents
 
@@ -35,30 +83,252 @@ class DocumentRetriever:
             logger.error(f"Document query failed: {str(e)}")
             return []
 
+    def query_documents_batch(
+        self,
+        queries: List[str],
+        ticker: str,
+        form_type: str = "10-K",
+        limit: int = 5,
+    ) -> List[Document]:
+        """Query SEC documents for several queries in one search request"""
+        return self._cached(
+            ("documents_batch", tuple(queries), ticker, form_type, limit),
+            lambda: self._query_documents_batch(queries, ticker, form_type, limit),
+        )
+
+    def _query_documents_batch(
+        self, queries: List[str], ticker: str, form_type: str, limit: int
+    ) -> List[Document]:
+        try:
+            embeddings_list = self._embed_batch(queries)
+            results = self.retriever.search_documents_batch(
+                embeddings_list=embeddings_list,
+                filters={"ticker": ticker, "formType": form_type},
+                limit=self._search_limit(limit),
+            )
+            results = [
+                self._rerank(query, result, limit)
+                for query, result in zip(queries, results)
+            ]
+
+            # Section queries often hit the same chunks - keep the first copy
+            seen = set()
+            documents = []
+            for document in (doc for result in results for doc in result):
+                if document.page_content in seen:
+                    continue
+                seen.add(document.page_content)
+                documents.append(document)
+
+            logger.info(
+                "Retrieved %d unique documents for %s (%s) from %d queries",
+                len(documents),
+                ticker,
+                form_type,
+                len(queries),
+            )
+            return documents
+
+        except Exception as e:
+            logger.error(f"Batch document query failed: {str(e)}")
+            return []
+
     def query_news(self, query: str, ticker: str, limit: int = 10) -> List[Document]:
         """Query news articles using embeddings"""
+        return self._cached(
+            ("news", query, ticker, limit),
+            lambda: self._query_news(query, ticker, limit),
+        )
+
+    def _query_news(self, query: str, ticker: str, limit: int) -> List[Document]:
         try:
-            query_embeddings = self.embedder.embed_query(query)
+            query_embeddings = self._embed(query)
+            scope = ("news", ticker, limit)
+            documents = self._semantic_get(scope, query_embeddings)
+            if documents is not None:
+                return documents
+
             documents = self.retriever.search_documents(
                 embeddings=query_embeddings,
                 filters={"ticker": ticker, "chunk_type": "news"},
-                limit=limit,
+                limit=self._search_limit(limit),
             )
+            documents = self._rerank(query, documents, limit)
+            self._semantic_set(scope, query_embeddings, documents)
 
-            logger.info(f"Retrieved {len(documents)} news articles for {ticker}")
+            logger.info("Retrieved %d news articles for %s", len(documents), ticker)
             return documents
 
         except Exception as e:
             logger.error(f"News query failed: {str(e)}")
             return []
 
+    def _embed(self, query: str) -> QueryEmbeddings:
+        """Embed query, reusing the precomputed vectors for static config queries"""
+        embeddings = self.precomputed_embeddings.get(query)
+        if embeddings is None:
+            embeddings = self.embedder.embed_query(query)
+        return embeddings
+
+    def _embed_batch(self, queries: List[str]) -> List[QueryEmbeddings]:
+        """Embed queries in order, batching the ones not precomputed"""
+        missing = [q for q in queries if q not in self.precomputed_embeddings]
+        embedded = self.embedder.embed_queries(missing) if missing else {}
+        return [
+            self.precomputed_embeddings.get(query) or embedded[query]
+            for query in queries
+        ]
+
+    def _cached(
+        self, key: Hashable, retrieve: Callable[[], List[Document]]
+    ) -> List[Document]:
+        """Serve a retrieval from cache, running it on a miss"""
+        if self.cache is None:
+            return retrieve()
+
+        documents = self.cache.get(key)
+        if documents is not None:
+            logger.info("Retrieval cache hit for %s query", key[0])
+            return list(documents)
+
+        return self._single_flight(key, lambda: self._fill(key, retrieve))
+
+    def _fill(
+        self, key: Hashable, retrieve: Callable[[], List[Document]]
+    ) -> List[Document]:
+        """Load a missed retrieval from the store or run it, then cache it"""
+        documents = self._load_stored(key)
+        if documents is None:
+            documents = retrieve()
+            # Failed searches return [] - don't pin those in the cache
+            if not documents:
+                return documents
+            self._save_stored(key, documents)
+
+        self.cache.set(key, list(documents))
+        return documents
+
+    def _single_flight(
+        self, key: Hashable, retrieve: Callable[[], List[Document]]
+    ) -> List[Document]:
+        """Run retrieve once for concurrent callers of the same key"""
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            logger.info("Joining in-flight %s query", key[0])
+            return list(future.result())
+
+        try:
+            documents = retrieve()
+            future.set_result(documents)
+            return documents
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    def _semantic_get(
+        self, scope: Hashable, embeddings: QueryEmbeddings
+    ) -> Optional[List[Document]]:
+        """Reuse the results of a near-identical earlier query with the same filters"""
+        if self.semantic_cache is None:
+            return None
+
+        documents = self.semantic_cache.get(scope, embeddings.dense)
+        if documents is None:
+            return None
+        logger.info("Semantic cache hit for %s query", scope[0])
+        return list(documents)
+
+    def _semantic_set(
+        self, scope: Hashable, embeddings: QueryEmbeddings, documents: List[Document]
+    ) -> None:
+        if self.semantic_cache is not None and documents:
+            self.semantic_cache.set(scope, embeddings.dense, list(documents))
+
+    @staticmethod
+    def _store_key(key: Hashable) -> str:
+        """Stable digest of a cache key, valid across processes"""
+        return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+    def _load_stored(self, key: Hashable) -> Optional[List[Document]]:
+        """Read a retrieval persisted by this or an earlier process"""
+        if self.store is None:
+            return None
+
+        try:
+            stored = self.store.get(self._store_key(key))
+            if stored is None:
+                return None
+            logger.info("Retrieval store hit for %s query", key[0])
+            return _documents_adapter.validate_json(stored)
+        except Exception as e:
+            # Persistence is best effort - fall back to searching Qdrant
+            logger.warning(f"Retrieval store read failed: {str(e)}")
+            return None
+
+    def _save_stored(self, key: Hashable, documents: List[Document]) -> None:
+        """Persist a retrieval so restarted workers can reuse it"""
+        if self.store is None:
+            return
+
+        try:
+            self.store.set(
+                self._store_key(key),
+                _documents_adapter.dump_json(documents).decode("utf-8"),
+            )
+        except Exception as e:
+            logger.warning(f"Retrieval store write failed: {str(e)}")
+
+    def _search_limit(self, limit: int) -> int:
+        """Number of candidates to fetch - more when they will be reranked"""
+        if self.reranker is None:
+            return limit
+        return max(limit, self.rerank_candidates)
+
+    def _rerank(
+        self, query: str, documents: List[Document], limit: int
+    ) -> List[Document]:
+        """Keep the limit documents the cross-encoder scores highest for query"""
+        if self.reranker is None or len(documents) <= limit:
+            return documents
+
+        scores = list(
+            self.reranker.rerank(query, [doc.page_content for doc in documents])
+        )
+        ranked = sorted(zip(scores, documents), key=lambda pair: pair[0], reverse=True)
+        return [document for _, document in ranked[:limit]]
+
     @staticmethod
     def documents_to_context(documents: List[Document], max_chars: int = 15000) -> str:
         """Convert documents to context string for LLM"""
         if not documents:
             return "No relevant content found"
 
-        content_parts = [doc.page_content for doc in documents if doc.page_content]
+        content_parts = []
+        total_chars = 0
+        seen = set()
+
+        # Stop collecting once past the budget instead of joining every document
+        for doc in documents:
+            content = doc.page_content
+            if not content or content in seen:
+                continue
+            seen.add(content)
+
+            # Length of the joined string so far, separators included
+            total_chars += len(content) + (2 if content_parts else 0)
+            content_parts.append(content)
+            if total_chars > max_chars:
+                break
+
         full_content = "\n\n".join(content_parts)
 
         # Truncate if too long
@@ -83,4 +353,24 @@ class DocumentRetriever:
 
             news_items.append(f"TITLE: {title}\nDATE: {date}\nCONTENT: {content}\n")
 
-        return "\n" + "=" * 50 + "\n".join(news_items)
+        return _NEWS_HEADER + "\n".join(news_items)
+
+
+@functools.lru_cache(maxsize=None)
+def get_retrieval_cache(maxsize: int = 512, ttl: int = 300) -> LRUCache:
+    """Return the process-wide cache of retrieval results"""
+    return LRUCache(maxsize=maxsize, ttl=ttl)
+
+
+@functools.lru_cache(maxsize=None)
+def get_retrieval_store(path: str, ttl: int = 300) -> SQLiteCache:
+    """Return the process-wide on-disk store of retrieval results"""
+    return SQLiteCache(path, ttl=ttl)
+
+
+@functools.lru_cache(maxsize=None)
+def get_semantic_cache(
+    threshold: float, maxsize: int = 256, ttl: int = 300
+) -> SemanticCache:
+    """Return the process-wide similarity cache of retrieval results"""
+    return SemanticCache(threshold=threshold, maxsize=maxsize, ttl=ttl)
@@ -1,9 +1,15 @@
 import os
-from typing import Optional
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
 from fastembed import TextEmbedding
 from fastembed.sparse.bm25 import Bm25
+from fastembed.sparse.sparse_embedding_base import SparseEmbedding
 from app.models.embeddings import QueryEmbeddings, SparseVector
 from fastembed.late_interaction import LateInteractionTextEmbedding
+from fastembed.rerank.cross_encoder import TextCrossEncoder
+from app.config.settings import Settings
+from app.utils.cache import LRUCache
 
 
 class QueryEmbedder:
@@ -14,6 +20,10 @@ class QueryEmbedder:
         late_interaction_model_name: str,
         cache_dir: Optional[str] = None,
         local_files_only: bool = True,
+        query_cache_size: int = 1024,
+        threads: Optional[int] = None,
+        providers: Optional[Sequence[str]] = None,
+        max_workers: int = 3,
     ):
         # Disable tokenizer parallelism to prevent deadlocks
         if "TOKENIZERS_PARALLELISM" not in os.environ:
@@ -25,28 +35,205 @@ class QueryEmbedder:
             model_kwargs["cache_dir"] = cache_dir
         model_kwargs["local_files_only"] = local_files_only
 
+        # ONNX session options only apply to the neural models, BM25 is pure Python
+        onnx_kwargs = {"threads": threads}
+        if providers:
+            onnx_kwargs["providers"] = list(providers)
+
         # Initialize the three embedding models with optional parameters
-        self.dense_embedding_model = TextEmbedding(dense_model_name, **model_kwargs)
+        self.dense_embedding_model = TextEmbedding(
+            dense_model_name, **model_kwargs, **onnx_kwargs
+        )
 
         self.bm25_embedding_model = Bm25(bm25_model_name, **model_kwargs)
 
         self.late_interaction_model = LateInteractionTextEmbedding(
-            late_interaction_model_name, **model_kwargs
+            late_interaction_model_name, **model_kwargs, **onnx_kwargs
         )
 
+        # The models are independent, so run them side by side; ONNX Runtime
+        # releases the GIL during inference. The calling thread takes BM25, so
+        # the pool needs at most two threads. 1 or less keeps them sequential
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if max_workers > 1:
+            self._executor = ThreadPoolExecutor(
+                max_workers=min(max_workers - 1, 2), thread_name_prefix="embedder"
+            )
+
+        # Recently embedded queries (e.g. per-ticker templates); 0 disables
+        self._query_cache: Optional[LRUCache[str, QueryEmbeddings]] = None
+        if query_cache_size:
+            self._query_cache = LRUCache(maxsize=query_cache_size)
+
     def embed_query(self, query: str) -> QueryEmbeddings:
-        # Get dense embeddings (e.g., [0.1, 0.2, ...])
-        dense_vector = next(self.dense_embedding_model.embed(query)).tolist()
+        if self._query_cache is None:
+            return self._embed_query(query)
+
+        key = self._cache_key(query)
+        embeddings = self._query_cache.get(key)
+        if embeddings is None:
+            embeddings = self._embed_query(query)
+            self._query_cache.set(key, embeddings)
+        return embeddings
+
+    @staticmethod
+    def _cache_key(query: str) -> str:
+        # All three tokenizers lowercase and drop surrounding whitespace, so
+        # these variants produce identical vectors
+        return query.strip().lower()
 
-        # Get sparse BM25 embeddings (keyword weights)
-        sparse_vector = next(self.bm25_embedding_model.embed(query))
+    def cache_stats(self) -> Dict[str, float]:
+        """Return hit/miss statistics of the query embedding cache"""
+        if self._query_cache is None:
+            return {"hits": 0, "misses": 0, "hit_rate": 0.0, "size": 0}
+        return self._query_cache.stats()
 
-        # Get late interaction embeddings (token-level vectors)
-        late_vector = next(self.late_interaction_model.embed(query)).tolist()
+    def _embed_query(self, query: str) -> QueryEmbeddings:
+        if self._executor is None:
+            # Get dense embeddings (e.g., [0.1, 0.2, ...])
+            dense_vector = next(self.dense_embedding_model.embed(query)).tolist()
+
+            # Get sparse BM25 embeddings (keyword weights)
+            sparse_vector = next(self.bm25_embedding_model.embed(query))
+
+            # Get late interaction embeddings (token-level vectors)
+            late_vector = next(self.late_interaction_model.embed(query)).tolist()
+        else:
+            # Slowest model first so it starts as early as possible
+            late_future = self._executor.submit(
+                lambda: next(self.late_interaction_model.embed(query)).tolist()
+            )
+            dense_future = self._executor.submit(
+                lambda: next(self.dense_embedding_model.embed(query)).tolist()
+            )
+            sparse_vector = next(self.bm25_embedding_model.embed(query))
+            dense_vector = dense_future.result()
+            late_vector = late_future.result()
 
         # Combine all embeddings into a single object
-        return QueryEmbeddings(
+        return self._to_query_embeddings(dense_vector, sparse_vector, late_vector)
+
+    @staticmethod
+    def _to_query_embeddings(
+        dense_vector: List[float],
+        sparse_vector: SparseEmbedding,
+        late_vector: List[List[float]],
+    ) -> QueryEmbeddings:
+        """Wrap model outputs without re-validating every float"""
+        # tolist() already yields plain Python ints and floats, so the field-by-field
+        # validation of thousands of ColBERT values would only repeat that work
+        return QueryEmbeddings.model_construct(
             dense=dense_vector,
-            sparse_bm25=SparseVector(**sparse_vector.as_object()),
+            sparse_bm25=SparseVector.model_construct(
+                indices=sparse_vector.indices.tolist(),
+                values=sparse_vector.values.tolist(),
+            ),
             late=late_vector,
         )
+
+    def embed_queries(
+        self, queries: Sequence[str], batch_size: int = 32
+    ) -> Dict[str, QueryEmbeddings]:
+        """Embed several queries in batches, keyed by query text"""
+        embeddings: Dict[str, QueryEmbeddings] = {}
+        missing = []
+        for query in dict.fromkeys(queries):
+            cached = (
+                self._query_cache.get(self._cache_key(query))
+                if self._query_cache is not None
+                else None
+            )
+            if cached is None:
+                missing.append(query)
+            else:
+                embeddings[query] = cached
+
+        if not missing:
+            return embeddings
+
+        # Similar lengths share a batch, so less of each batch is padding
+        missing.sort(key=len)
+        dense_vectors = self.dense_embedding_model.embed(missing, batch_size=batch_size)
+        sparse_vectors = self.bm25_embedding_model.embed(missing, batch_size=batch_size)
+
+        for query, dense_vector, sparse_vector in zip(
+            missing, dense_vectors, sparse_vectors
+        ):
+            # ColBERT keeps one row per padded token in a batch, so embed it alone
+            late_vector = next(self.late_interaction_model.embed(query)).tolist()
+            embeddings[query] = self._to_query_embeddings(
+                dense_vector.tolist(), sparse_vector, late_vector
+            )
+            if self._query_cache is not None:
+                self._query_cache.set(self._cache_key(query), embeddings[query])
+
+        return embeddings
+
+    def warmup(self) -> None:
+        """Run one throwaway query so ONNX sessions are initialized before traffic"""
+        self._embed_query("warmup")
+
+
+@functools.lru_cache(maxsize=None)
+def get_query_embedder(
+    dense_model_name: str,
+    bm25_model_name: str,
+    late_interaction_model_name: str,
+    cache_dir: Optional[str] = None,
+    local_files_only: bool = True,
+    query_cache_size: int = 1024,
+    threads: Optional[int] = None,
+    providers: Optional[Tuple[str, ...]] = None,
+    max_workers: int = 3,
+) -> QueryEmbedder:
+    """Return the process-wide query embedder for the given models"""
+    return QueryEmbedder(
+        dense_model_name=dense_model_name,
+        bm25_model_name=bm25_model_name,
+        late_interaction_model_name=late_interaction_model_name,
+        cache_dir=cache_dir,
+        local_files_only=local_files_only,
+        query_cache_size=query_cache_size,
+        threads=threads,
+        providers=providers,
+        max_workers=max_workers,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_precomputed_embeddings(
+    embedder: QueryEmbedder, queries: Tuple[str, ...]
+) -> Dict[str, QueryEmbeddings]:
+    """Embed a fixed set of queries once per process for the given embedder"""
+    return embedder.embed_queries(queries)
+
+
+def get_query_embedder_for_settings(settings: Settings) -> QueryEmbedder:
+    """Return the shared query embedder configured from application settings"""
+    return get_query_embedder(
+        settings.dense_model_name,
+        settings.bm25_model_name,
+        settings.late_interaction_model_name,
+        cache_dir=settings.embedder_cache_dir,
+        local_files_only=settings.embedder_local_files_only,
+        query_cache_size=settings.embedder_query_cache_size,
+        threads=settings.embedder_threads,
+        # Tuple so the factory's lru_cache can hash it
+        providers=(
+            tuple(settings.embedder_providers) if settings.embedder_providers else None
+        ),
+        max_workers=settings.embedder_workers,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_reranker(
+    model_name: str,
+    cache_dir: Optional[str] = None,
+    local_files_only: bool = True,
+) -> TextCrossEncoder:
+    """Return the process-wide cross-encoder used to rerank retrieved chunks"""
+    model_kwargs = {"local_files_only": local_files_only}
+    if cache_dir is not None:
+        model_kwargs["cache_dir"] = cache_dir
+    return TextCrossEncoder(model_name, **model_kwargs)
@@ -0,0 +1,103 @@
+import hashlib
+import functools
+from typing import Awaitable, Callable, Optional, Type, TypeVar
+from pydantic import BaseModel
+from app.utils.cache import LRUCache
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class LLMCache:
+    """Two-tier cache (in-process LRU + optional Redis) for structured LLM responses"""
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        ttl: int = 86400,
+        redis_url: Optional[str] = None,
+    ):
+        self.ttl = ttl
+        self._local: LRUCache[str, str] = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._redis = None
+
+        if redis_url:
+            try:
+                import redis.asyncio as redis
+
+                self._redis = redis.from_url(redis_url)
+            except ImportError:
+                logger.warning(
+                    "redis package not installed - LLM cache is in-process only"
+                )
+
+    @staticmethod
+    def make_key(
+        model: str,
+        prompt_name: str,
+        system_prompt: str,
+        user_content: str,
+        response_model: Type[BaseModel],
+    ) -> str:
+        """Build a cache key for a structured call"""
+        digest = hashlib.sha256(
+            f"{system_prompt}\x00{user_content}".encode("utf-8")
+        ).hexdigest()
+        return f"llm:{model}:{prompt_name}:{response_model.__name__}:{digest}"
+
+    async def get_or_call(
+        self,
+        key: str,
+        response_model: Type[T],
+        call: Callable[[], Awaitable[T]],
+    ) -> T:
+        """Return the cached response for key, or run call and cache its result"""
+        cached = await self._get(key)
+        if cached is not None:
+            logger.info("LLM cache hit for %s", response_model.__name__)
+            return response_model.model_validate_json(cached)
+
+        result = await call()
+        await self._set(key, result.model_dump_json())
+        return result
+
+    async def _get(self, key: str) -> Optional[str]:
+        cached = self._local.get(key)
+        if cached is not None or self._redis is None:
+            return cached
+
+        try:
+            cached = await self._redis.get(key)
+        except Exception as e:
+            # Cache failures must never break the analysis
+            logger.warning(f"Redis cache read failed: {str(e)}")
+            return None
+
+        if cached is not None:
+            cached = cached.decode("utf-8") if isinstance(cached, bytes) else cached
+            self._local.set(key, cached)
+        return cached
+
+    async def _set(self, key: str, value: str) -> None:
+        self._local.set(key, value)
+        if self._redis is None:
+            return
+
+        try:
+            await self._redis.setex(key, self.ttl, value)
+        except Exception as e:
+            logger.warning(f"Redis cache write failed: {str(e)}")
+
+    def clear(self) -> None:
+        """Clear the in-process cache tier"""
+        self._local.clear()
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm_cache(
+    maxsize: int = 256, ttl: int = 86400, redis_url: Optional[str] = None
+) -> LLMCache:
+    """Return the process-wide LLM cache for the given configuration"""
+    return LLMCache(maxsize=maxsize, ttl=ttl, redis_url=redis_url)
@@ -0,0 +1,103 @@
+import functools
+from typing import List, Optional, Type, TypeVar
+import httpx
+import instructor
+from groq import AsyncGroq, DefaultAsyncHttpxClient
+from instructor.function_calls import OpenAISchema, openai_schema
+from instructor.utils import classproperty
+from pydantic import BaseModel
+from app.config.settings import Settings
+
+T = TypeVar("T", bound=BaseModel)
+
+# Clients handed out by get_llm_client, closed together on shutdown
+_open_clients: List[AsyncGroq] = []
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm_client(
+    api_key: Optional[str],
+    max_connections: int = 64,
+    max_keepalive_connections: int = 32,
+    timeout: float = 60.0,
+    connect_timeout: float = 5.0,
+    http2: bool = True,
+    max_retries: int = 4,
+) -> AsyncGroq:
+    """
+    Return the process-wide AsyncGroq client for the given configuration
+
+    All services share one client so concurrent analyzer calls reuse the same
+    keep-alive connection pool instead of paying a TLS handshake each.
+    Rate-limited (429) requests are retried by the SDK, which waits for the
+    server's retry-after / retry-after-ms hint before backing off exponentially.
+    """
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        http2=http2,
+    )
+    client = AsyncGroq(
+        api_key=api_key, http_client=http_client, max_retries=max_retries
+    )
+    _open_clients.append(client)
+    return client
+
+
+async def close_llm_clients() -> None:
+    """Close the connection pools of every shared client and forget them"""
+    clients = list(_open_clients)
+    _open_clients.clear()
+    get_instructor_client.cache_clear()
+    get_llm_client.cache_clear()
+
+    for client in clients:
+        await client.close()
+
+
+def get_llm_client_for_settings(settings: Settings) -> AsyncGroq:
+    """Return the shared AsyncGroq client configured from application settings"""
+    return get_llm_client(
+        settings.llm_api_key,
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_keepalive_connections,
+        timeout=settings.llm_timeout,
+        connect_timeout=settings.llm_connect_timeout,
+        http2=settings.llm_http2,
+        max_retries=settings.llm_max_retries,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_instructor_client(client: AsyncGroq) -> instructor.AsyncInstructor:
+    """Return the Instructor-patched wrapper shared by all users of client"""
+    return instructor.from_groq(client)
+
+
+@functools.lru_cache(maxsize=None)
+def get_response_model(response_model: Type[T]) -> Type[T]:
+    """
+    Return an Instructor-ready version of response_model with its schema cached
+
+    Instructor wraps plain Pydantic models with create_model() and rebuilds the
+    JSON schema on every call. Wrapping once per model and pinning the schema
+    keeps that reflection off the request path.
+    """
+    if issubclass(response_model, OpenAISchema):
+        wrapped = response_model
+    else:
+        wrapped = openai_schema(response_model)
+
+    schema = wrapped.openai_schema
+    return type(
+        response_model.__name__,
+        (wrapped,),
+        {
+            "__module__": response_model.__module__,
+            "__doc__": response_model.__doc__,
+            "openai_schema": classproperty(lambda cls: schema),
+        },
+    )
@@ -1,25 +1,55 @@
-from typing import List, AsyncGenerator
-from groq import AsyncGroq  # Changed to async for consistency
+from typing import Any, AsyncGenerator, Dict, List, Optional
 from app.models.embeddings import Document
 from app.config.settings import Settings
-from app.services.prompt_manager import PromptManager
-from pathlib import Path
+from app.services.llm_client import get_llm_client_for_settings
+from app.services.prompt_manager import PROMPTS_DIR, get_prompt_manager
 import logging
-import json
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Fixed parts of the stream events - only the delta text needs escaping per chunk
+_TEXT_DELTA_PREFIX = '{"type":"text_delta","delta":'
+_STREAM_COMPLETED_EVENT = orjson.dumps({"type": "stream_completed"}).decode()
+
 
 class LLMService:
     def __init__(self, settings: Settings):
-        self.client = AsyncGroq(api_key=settings.llm_api_key)  # Changed to AsyncGroq
+        self.client = get_llm_client_for_settings(settings)
         self.default_model = settings.llm_model
         self.default_temperature = settings.llm_temperature
         self.default_max_output_tokens = settings.llm_max_output_tokens
 
-        # Initialize prompt manager to load system prompt
-        prompts_dir = Path(__file__).parent.parent / "prompts"
-        self.prompt_manager = PromptManager(prompts_dir)
+        # Shared prompt manager - system prompts are loaded once per process
+        self.prompt_manager = get_prompt_manager(PROMPTS_DIR)
+        self._system_prompt_template = self.prompt_manager.get_prompt("rag_response")
+
+    def _completion_params(
+        self,
+        query: str,
+        context_documents: List[Document],
+        model: Optional[str],
+        temperature: Optional[float],
+        max_output_tokens: Optional[int],
+    ) -> Dict[str, Any]:
+        """Build the chat completion arguments shared by both generate methods"""
+        context = "\n\n".join([doc.page_content for doc in context_documents])
+
+        return {
+            "model": model or self.default_model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": self._system_prompt_template.format(
+                        context=context, query=query
+                    ),
+                }
+            ],
+            "temperature": (
+                temperature if temperature is not None else self.default_temperature
+            ),
+            "max_tokens": max_output_tokens or self.default_max_output_tokens,
+        }
 
     async def generate_response(  # Added async
         self,
@@ -29,24 +59,13 @@ class LLMService:
         temperature: float = None,
         max_output_tokens: int = None,
     ) -> str:
-        model = model or self.default_model
-        temperature = (
-            temperature if temperature is not None else self.default_temperature
+        params = self._completion_params(
+            query, context_documents, model, temperature, max_output_tokens
         )
-        max_output_tokens = max_output_tokens or self.default_max_output_tokens
-
-        context = "\n\n".join([doc.page_content for doc in context_documents])
-
-        # Load system prompt from prompts directory
-        system_prompt_template = self.prompt_manager.get_prompt("rag_response")
-        system_prompt = system_prompt_template.format(context=context, query=query)
 
         try:
             completion = await self.client.chat.completions.create(  # Added await
-                model=model,
-                messages=[{"role": "system", "content": system_prompt}],
-                temperature=temperature,
-                max_tokens=max_output_tokens,
+                **params
             )
 
             return completion.choices[0].message.content
@@ -67,49 +86,34 @@ class LLMService:
         temperature: float = None,
         max_output_tokens: int = None,
     ) -> AsyncGenerator[str, None]:
-        model = model or self.default_model
-        temperature = (
-            temperature if temperature is not None else self.default_temperature
+        params = self._completion_params(
+            query, context_documents, model, temperature, max_output_tokens
         )
-        max_output_tokens = max_output_tokens or self.default_max_output_tokens
-
-        context = "\n\n".join([doc.page_content for doc in context_documents])
-
-        # Load system prompt from prompts directory
-        system_prompt_template = self.prompt_manager.get_prompt("rag_response")
-        system_prompt = system_prompt_template.format(context=context, query=query)
 
         try:
             # Create streaming response
             stream = await self.client.chat.completions.create(  # Added await
-                model=model,
-                messages=[{"role": "system", "content": system_prompt}],
-                temperature=temperature,
-                max_tokens=max_output_tokens,
+                **params,
                 stream=True,  # Enable streaming
             )
 
             # Process stream events
             async for chunk in stream:  # Changed to async for
-                if chunk.choices[0].delta.content is not None:
-                    yield json.dumps(
-                        {
-                            "type": "text_delta",
-                            "delta": chunk.choices[0].delta.content,
-                        }
-                    )
+                delta = chunk.choices[0].delta.content
+                if delta is not None:
+                    yield _TEXT_DELTA_PREFIX + orjson.dumps(delta).decode() + "}"
 
             # Send completion event
-            yield json.dumps({"type": "stream_completed"})
+            yield _STREAM_COMPLETED_EVENT
 
         except Exception as e:
             logger.error(
                 "LLM stream response generation failed",
                 extra={"error": str(e), "query": query},
             )
-            yield json.dumps(
+            yield orjson.dumps(
                 {
                     "type": "error",
                     "message": f"Failed to generate stream response: {str(e)}",
                 }
-            )
+            ).decode()
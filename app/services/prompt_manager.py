@@ -1,17 +1,20 @@
+import functools
 from pathlib import Path
 from typing import Dict, List
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Default prompts location (app/prompts)
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
+
 
 class PromptManager:
     """Service responsible for loading and caching prompts"""
 
-    def __init__(self, prompts_dir: Path = None):
+    def __init__(self, prompts_dir: Path = None, preload: bool = False):
         if prompts_dir is None:
-            # Default to app/prompts directory
-            prompts_dir = Path(__file__).parent.parent / "prompts"
+            prompts_dir = PROMPTS_DIR
 
         self.prompts_dir = prompts_dir
         self._prompt_cache: Dict[str, str] = {}
@@ -21,6 +24,9 @@ class PromptManager:
             logger.warning(f"Prompts directory not found: {self.prompts_dir}")
             self.prompts_dir.mkdir(parents=True, exist_ok=True)
 
+        if preload:
+            self.preload_prompts()
+
     def get_prompt(self, name: str) -> str:
         """Load prompt with lazy loading and caching"""
         if name not in self._prompt_cache:
@@ -38,12 +44,19 @@ class PromptManager:
 
         try:
             self._prompt_cache[name] = prompt_file.read_text(encoding="utf-8")
-            logger.debug(f"Loaded prompt: {name}.md")
+            logger.debug("Loaded prompt: %s.md", name)
         except Exception as e:
             error_msg = f"Failed to read prompt {name}.md: {e}"
             logger.error(error_msg)
             raise Exception(error_msg)
 
+    def preload_prompts(self) -> None:
+        """Load every available prompt into cache up front"""
+        for name in self.list_available_prompts():
+            if name not in self._prompt_cache:
+                self._load_prompt(name)
+        logger.info("Preloaded %d prompts", len(self._prompt_cache))
+
     def reload_prompt(self, name: str) -> str:
         """Force reload a prompt from disk"""
         if name in self._prompt_cache:
@@ -59,3 +72,9 @@ class PromptManager:
         """List all available prompt files"""
         prompt_files = self.prompts_dir.glob("*.md")
         return [f.stem for f in prompt_files]
+
+
+@functools.lru_cache(maxsize=None)
+def get_prompt_manager(prompts_dir: Path = None) -> PromptManager:
+    """Return the process-wide prompt manager with all prompts preloaded"""
+    return PromptManager(prompts_dir, preload=True)
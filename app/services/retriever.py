@@ -1,5 +1,5 @@
 from typing import List, Optional, Dict
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, models
 from app.models.embeddings import Document, QueryEmbeddings
 from app.config.settings import Settings
 from qdrant_client.http.exceptions import UnexpectedResponse
@@ -12,7 +12,11 @@ logger = logging.getLogger(__name__)
 class QdrantRetriever:
     def __init__(self, settings: Settings):
         # Basic client setup
-        client_params = {"url": settings.qdrant_url, "timeout": settings.qdrant_timeout}
+        client_params = {
+            "url": settings.qdrant_url,
+            "timeout": settings.qdrant_timeout,
+            "prefer_grpc": settings.qdrant_prefer_grpc,
+        }
 
         # Add API key if provided
         if settings.qdrant_api_key:
@@ -21,6 +25,17 @@ class QdrantRetriever:
         self.client = QdrantClient(**client_params)
         self.collection_name = settings.collection_name
         self.prefetch_limit = settings.prefetch_limit
+        # Typed models rather than dicts - only the REST transport accepts dicts
+        self.dense_search_params = models.SearchParams(
+            quantization=models.QuantizationSearchParams(
+                rescore=settings.quantization_rescore,
+                oversampling=settings.quantization_oversampling,
+            )
+        )
+
+    def close(self) -> None:
+        """Close the underlying Qdrant connections"""
+        self.client.close()
 
     def search_documents(
         self,
@@ -29,48 +44,21 @@ class QdrantRetriever:
         filters: Optional[Dict[str, str]] = None,
     ) -> List[Document]:
         try:
-            # Qdrant filter
-            query_filter = None
-            if filters:
-                must_conditions = []
-                for key, value in filters.items():
-                    must_conditions.append(
-                        {"key": f"metadata.{key}", "match": {"value": value}}
-                    )
-                query_filter = {"must": must_conditions}
-
             # Search using all vector types
             search_result = self.client.query_points(
                 collection_name=self.collection_name,
                 # First stage: Get candidates using dense and sparse search
-                prefetch=[
-                    {
-                        "query": embeddings.dense,
-                        "using": "dense",
-                        "limit": self.prefetch_limit,
-                    },
-                    {
-                        "query": embeddings.sparse_bm25.model_dump(),
-                        "using": "sparse",
-                        "limit": self.prefetch_limit,
-                    },
-                ],
+                prefetch=self._build_prefetch(embeddings),
                 # Second stage: Rerank using late interaction
                 query=embeddings.late,
                 using="colbertv2.0",
                 with_payload=True,
                 limit=limit,
-                query_filter=query_filter,
+                query_filter=self._build_filter(filters),
             )
 
             # Convert results to Document objects
-            return [
-                Document(
-                    page_content=point.payload.get("text", ""),
-                    metadata=point.payload.get("metadata", {}),
-                )
-                for point in search_result.points
-            ]
+            return self._to_documents(search_result.points)
 
         except UnexpectedResponse as e:
             # Handle Qdrant-specific errors
@@ -88,3 +76,90 @@ class QdrantRetriever:
                 extra={"error": str(e), "collection": self.collection_name},
             )
             raise HTTPException(status_code=500, detail="Internal server error")
+
+    def search_documents_batch(
+        self,
+        embeddings_list: List[QueryEmbeddings],
+        limit: int = 5,
+        filters: Optional[Dict[str, str]] = None,
+    ) -> List[List[Document]]:
+        """Run several hybrid searches sharing one filter in a single request"""
+        query_filter = self._build_filter(filters)
+
+        try:
+            batch_result = self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[
+                    models.QueryRequest(
+                        prefetch=self._build_prefetch(embeddings),
+                        query=embeddings.late,
+                        using="colbertv2.0",
+                        with_payload=True,
+                        limit=limit,
+                        filter=query_filter,
+                    )
+                    for embeddings in embeddings_list
+                ],
+            )
+
+            return [self._to_documents(result.points) for result in batch_result]
+
+        except UnexpectedResponse as e:
+            logger.error(
+                "Qdrant batch search failed",
+                extra={"error": str(e), "collection": self.collection_name},
+            )
+            raise HTTPException(
+                status_code=503, detail="Search service temporarily unavailable"
+            )
+        except Exception as e:
+            logger.error(
+                "Unexpected error during batch search",
+                extra={"error": str(e), "collection": self.collection_name},
+            )
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+    @staticmethod
+    def _build_filter(filters: Optional[Dict[str, str]]) -> Optional[models.Filter]:
+        """Build a Qdrant metadata filter from key/value pairs"""
+        if not filters:
+            return None
+
+        must_conditions = []
+        for key, value in filters.items():
+            must_conditions.append(
+                models.FieldCondition(
+                    key=f"metadata.{key}", match=models.MatchValue(value=value)
+                )
+            )
+        return models.Filter(must=must_conditions)
+
+    def _build_prefetch(self, embeddings: QueryEmbeddings) -> List[models.Prefetch]:
+        """First stage candidates from dense and sparse search"""
+        return [
+            models.Prefetch(
+                query=embeddings.dense,
+                using="dense",
+                limit=self.prefetch_limit,
+                params=self.dense_search_params,
+            ),
+            models.Prefetch(
+                query=models.SparseVector(
+                    indices=embeddings.sparse_bm25.indices,
+                    values=embeddings.sparse_bm25.values,
+                ),
+                using="sparse",
+                limit=self.prefetch_limit,
+            ),
+        ]
+
+    @staticmethod
+    def _to_documents(points) -> List[Document]:
+        """Convert Qdrant points to Document objects"""
+        return [
+            Document(
+                page_content=point.payload.get("text", ""),
+                metadata=point.payload.get("metadata", {}),
+            )
+            for point in points
+        ]
@@ -1,12 +1,17 @@
+import re
 from typing import Optional
 from groq import AsyncGroq
-import instructor
 from pydantic import BaseModel
+from app.services.llm_client import get_instructor_client, get_response_model
+from app.utils.cache import LRUCache
 from app.utils.decorators import handle_errors
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Cashtags ($AAPL) or bare upper-case words that may be ticker symbols
+_TICKER_RE = re.compile(r"\$([A-Z]{1,5})\b|\b([A-Z]{2,5})\b")
+
 
 class TickerResponse(BaseModel):
     """Pydantic model for ticker extraction response"""
@@ -20,75 +25,102 @@ class TickerExtractor:
 
     def __init__(
         self,
-        llm_api_key: str,
+        llm_client: AsyncGroq,
         model: str,
         prompt_manager,
         config_loader,
         temperature: float = 0.0,
         max_tokens: int = 50,  # Increased for reasoning
+        cache_size: int = 1024,
+        cache_ttl: Optional[float] = None,
     ):
-        # Initialize client and patch with Instructor
-        base_client = AsyncGroq(api_key=llm_api_key)
-        self.client = instructor.from_groq(base_client)
+        # Shared Instructor wrapper around the pooled client
+        self.client = get_instructor_client(llm_client)
         self.model = model
         self.prompt_manager = prompt_manager
+        self._extraction_prompt = prompt_manager.get_prompt("ticker_extraction")
         self.config_loader = config_loader
         self.temperature = temperature
         self.max_tokens = max_tokens
 
+        # Tickers resolved by mapping or LLM, by case-folded message
+        self._cache: LRUCache[str, str] = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+
     @handle_errors("Ticker extraction")
     async def extract_ticker(self, message: str) -> Optional[str]:
         """Extract ticker symbol from user message using mapping + LLM fallback"""
-
-        # First try: Direct mapping (fast)
-        ticker = self._try_direct_mapping(message)
+        # First try: Ticker symbol written in the message (fastest). It is
+        # case-sensitive, so it runs before the case-folded cache lookup
+        ticker = self._try_ticker_symbol(message)
         if ticker:
             return ticker
 
-        # Second try: LLM extraction with Instructor (slower but comprehensive)
-        return await self._try_llm_extraction(message)
+        cache_key = message.strip().lower()
+        ticker = self._cache.get(cache_key)
+        if ticker:
+            return ticker
 
-    def _try_direct_mapping(self, message: str) -> Optional[str]:
-        """Try to find ticker using direct company name mapping from config"""
-        message_lower = message.lower()
+        # Second try: Direct mapping (fast)
+        ticker = self._try_direct_mapping(message)
 
-        # Get mappings from config
-        company_map = self.config_loader.get_ticker_mappings()
+        # Last try: LLM extraction with Instructor (slower but comprehensive)
+        if not ticker:
+            ticker = await self._try_llm_extraction(message)
 
-        for company, ticker in company_map.items():
-            if company.lower() in message_lower:
-                logger.info(f"Direct mapping found ticker: {ticker}")
+        # Only cache resolved tickers - a miss may succeed on retry
+        if ticker:
+            self._cache.set(cache_key, ticker)
+        return ticker
+
+    def _try_ticker_symbol(self, message: str) -> Optional[str]:
+        """Find a cashtag, or an upper-case word that is a known ticker"""
+        known_tickers = self.config_loader.get_known_tickers()
+
+        for match in _TICKER_RE.finditer(message):
+            cashtag, word = match.groups()
+            # Cashtags are explicit; bare words must be a mapped ticker ("CEO", "USA")
+            if cashtag or word in known_tickers:
+                ticker = cashtag or word
+                logger.info("Ticker symbol found in message: %s", ticker)
                 return ticker
 
         return None
 
+    def _try_direct_mapping(self, message: str) -> Optional[str]:
+        """Try to find ticker using direct company name mapping from config"""
+        # Single scan against the loader's precompiled company-name pattern
+        ticker = self.config_loader.find_ticker(message)
+        if ticker:
+            logger.info("Direct mapping found ticker: %s", ticker)
+        return ticker
+
     @handle_errors("LLM ticker extraction")
     async def _try_llm_extraction(self, message: str) -> Optional[str]:
         """Use LLM with Instructor to extract ticker from message"""
         logger.info("Using LLM to extract ticker from message")
 
-        extraction_prompt = self.prompt_manager.get_prompt("ticker_extraction")
-
         # Use Instructor for structured extraction
         response = await self.client.chat.completions.create(
             model=self.model,
             temperature=self.temperature,
             max_tokens=self.max_tokens,
             messages=[
-                {"role": "system", "content": extraction_prompt},
+                {"role": "system", "content": self._extraction_prompt},
                 {"role": "user", "content": f"Extract ticker from: {message}"},
             ],
-            response_model=TickerResponse,  # Instructor handles validation
+            response_model=get_response_model(TickerResponse),
         )
 
         # Validate ticker
         if not response.ticker or response.ticker == "NONE" or len(response.ticker) > 6:
             logger.info(
-                f"LLM could not extract valid ticker. Reasoning: {response.reasoning}"
+                "LLM could not extract valid ticker. Reasoning: %s", response.reasoning
             )
             return None
 
         logger.info(
-            f"LLM extracted ticker: {response.ticker}. Reasoning: {response.reasoning}"
+            "LLM extracted ticker: %s. Reasoning: %s",
+            response.ticker,
+            response.reasoning,
         )
         return response.ticker.upper()
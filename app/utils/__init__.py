@@ -1,3 +1,4 @@
+from app.utils.cache import LRUCache, SemanticCache, SQLiteCache
 from app.utils.decorators import (
     handle_errors,
     handle_analyzer_errors,
@@ -5,6 +6,9 @@ from app.utils.decorators import (
 )
 
 __all__ = [
+    "LRUCache",
+    "SemanticCache",
+    "SQLiteCache",
     "handle_errors",
     "handle_analyzer_errors",
     "handle_service_errors",
@@ -0,0 +1,200 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Generic, Hashable, List, Optional, Sequence, Tuple, TypeVar
+import numpy as np
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Thread-safe LRU cache with optional time-to-live for entries"""
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[K, Tuple[Optional[float], V]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Return cached value for key, or default if missing or expired"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        """Store value for key, evicting the least recently used entries"""
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached entries"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counts and hit rate since the cache was created"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._data),
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SemanticCache(Generic[V]):
+    """Thread-safe cache serving values for queries whose vector is near a cached one"""
+
+    def __init__(
+        self, threshold: float = 0.9, maxsize: int = 256, ttl: Optional[float] = None
+    ):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Row i of _vectors is the unit query vector of _entries[i]
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: List[Tuple[Hashable, Optional[float], V]] = []
+        self._last_used = np.zeros(maxsize, dtype=np.int64)
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, scope: Hashable, vector: Sequence[float]) -> Optional[V]:
+        """Return the value of the most similar cached query with the same scope"""
+        query = self._normalize(vector)
+        now = time.monotonic()
+
+        with self._lock:
+            if self._entries:
+                scores = self._vectors[: len(self._entries)] @ query
+                candidates = np.flatnonzero(scores >= self.threshold)
+                for index in candidates[np.argsort(-scores[candidates])]:
+                    entry_scope, expires_at, value = self._entries[index]
+                    if entry_scope != scope:
+                        continue
+                    if expires_at is not None and expires_at < now:
+                        continue
+
+                    self._clock += 1
+                    self._last_used[index] = self._clock
+                    self.hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def set(self, scope: Hashable, vector: Sequence[float], value: V) -> None:
+        """Cache value for a query, replacing the least recently used entry if full"""
+        query = self._normalize(vector)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                self._vectors = np.zeros((self.maxsize, query.shape[0]), np.float32)
+                self._entries.clear()
+
+            if len(self._entries) < self.maxsize:
+                index = len(self._entries)
+                self._entries.append((scope, expires_at, value))
+            else:
+                index = int(np.argmin(self._last_used))
+                self._entries[index] = (scope, expires_at, value)
+
+            self._vectors[index] = query
+            self._clock += 1
+            self._last_used[index] = self._clock
+
+    def clear(self) -> None:
+        """Remove all cached entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """Thread-safe string key/value store on SQLite with time-to-live for entries"""
+
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        """Return stored value for key, or None if missing or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, expires_at = row
+            if expires_at is not None and expires_at < time.time():
+                with self._conn:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store value for key, replacing any previous entry"""
+        # Wall-clock expiry so entries stay valid across process restarts
+        expires_at = time.time() + self.ttl if self.ttl else None
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+
+    def clear(self) -> None:
+        """Remove all stored entries"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache")
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -59,9 +59,9 @@ def handle_analyzer_errors(analyzer_name: str):
         @functools.wraps(func)
         async def wrapper(self, ticker: str, *args, **kwargs) -> T:
             try:
-                logger.info(f"Starting {analyzer_name} analysis for {ticker}")
+                logger.info("Starting %s analysis for %s", analyzer_name, ticker)
                 result = await func(self, ticker, *args, **kwargs)
-                logger.info(f"Completed {analyzer_name} analysis for {ticker}")
+                logger.info("Completed %s analysis for %s", analyzer_name, ticker)
                 return result
             except Exception as e:
                 logger.error(f"{analyzer_name} analysis failed for {ticker}: {str(e)}")
@@ -27,7 +27,20 @@ client.create_collection(
     collection_name=COLLECTION_NAME,
     vectors_config={
         # Vetor denso (semântico)
-        "dense": VectorParams(size=384, distance=Distance.COSINE),
+        "dense": VectorParams(
+            size=384,
+            distance=Distance.COSINE,
+            # Originais em disco; só a cópia quantizada fica na RAM
+            on_disk=True,
+            # Quantização escalar int8: 4x menos memória por varredura do HNSW
+            quantization_config=models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=True,
+                ),
+            ),
+        ),
         # Vetor de interação tardia (ColBERT)
         "colbertv2.0": VectorParams(
             size=128,
@@ -35,6 +48,11 @@ client.create_collection(
             multivector_config=models.MultiVectorConfig(
                 comparator=models.MultiVectorComparator.MAX_SIM,
             ),
+            # Usado só no reranking dos candidatos: sem índice HNSW e em disco
+            hnsw_config=models.HnswConfigDiff(m=0),
+            on_disk=True,
+            # Armazenado em float16: metade dos bytes do maior vetor da collection
+            datatype=models.Datatype.FLOAT16,
         ),
     },
     sparse_vectors_config={
@@ -1,9 +1,16 @@
 import os
+import re
 import html
+import json
+import hashlib
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import uuid
 from tqdm.auto import tqdm
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, Optional
 from dataclasses import dataclass
+from pathlib import Path
 from dotenv import load_dotenv
 
 # SEC API
@@ -11,7 +18,7 @@ from sec_api import QueryApi, ExtractorApi
 
 # Qdrant
 from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, List
+from qdrant_client.models import OptimizersConfigDiff, PointStruct
 
 # Embeddings
 from fastembed.sparse.bm25 import Bm25
@@ -19,9 +26,9 @@ from fastembed.late_interaction import LateInteractionTextEmbedding
 from fastembed import TextEmbedding
 
 # Semantic chunking
-from sentence_transformers import SentenceTransformer
 import hdbscan
 import tiktoken
+import numpy as np
 
 # Configuration
 load_dotenv()
@@ -30,6 +37,24 @@ EMBED_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
 SPARSE_MODEL_ID = "Qdrant/bm25"
 COLBERT_MODEL_ID = "colbert-ir/colbertv2.0"
 MAX_TOKENS = 384
+COLLECTION_NAME = os.getenv("COLLECTION_NAME")
+# Fetched filings are kept here; delete an entry to pull the filing again
+SEC_CACHE_DIR = Path(os.getenv("SEC_CACHE_DIR", ".sec_cache"))
+TOKENIZER = tiktoken.encoding_for_model("gpt-4o")
+# Past this many paragraphs, cluster each ITEM section on its own
+SEGMENT_PARAGRAPHS = 2000
+HEADING_RE = re.compile(r"\n(?=(?:ITEM|Item)\s+\d+[A-Z]?\.\s)")
+
+# Indexing threshold restored after uploads when the server reports none (or 0,
+# left behind by an interrupted earlier run)
+DEFAULT_INDEXING_THRESHOLD = 20000
+
+# Run dense and ColBERT encoding on the GPU (requires onnxruntime-gpu)
+PROVIDERS = (
+    ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    if os.getenv("USE_CUDA", "").lower() in ("1", "true", "yes")
+    else None
+)
 
 
 @dataclass
@@ -49,31 +74,52 @@ def setup_sec_apis():
     return query_api, extractor_api
 
 
+@functools.lru_cache(maxsize=1)
 def setup_qdrant_client():
-    """Initialize Qdrant client (assumes collection already exists)"""
-    # Load environment variables
-    load_dotenv()
-
+    """Initialize Qdrant client once per process (assumes collection already exists)"""
     client = QdrantClient(
         url=os.getenv("QDRANT_URL"),
         api_key=os.getenv("QDRANT_API_KEY"),
+        # Opt-in protobuf instead of JSON for the bulky ColBERT multivectors;
+        # needs the Qdrant gRPC port reachable
+        prefer_grpc=os.getenv("INGESTION_PREFER_GRPC", "false").lower()
+        in ("1", "true", "yes"),
+        grpc_port=int(os.getenv("QDRANT_GRPC_PORT", "6334")),
     )
 
     return client
 
 
+@functools.lru_cache(maxsize=None)
+def _get_dense(model_id: str = EMBED_MODEL_ID) -> TextEmbedding:
+    """Load the dense model once per process"""
+    return TextEmbedding(model_id, providers=PROVIDERS)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_bm25(model_id: str = SPARSE_MODEL_ID) -> Bm25:
+    """Load the BM25 model once per process"""
+    return Bm25(model_name=model_id)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_colbert(model_id: str = COLBERT_MODEL_ID) -> LateInteractionTextEmbedding:
+    """Load the ColBERT model once per process"""
+    return LateInteractionTextEmbedding(model_name=model_id, providers=PROVIDERS)
+
+
 def setup_embedding_models(config: ProcessingConfig):
     """Initialize all embedding models"""
     print("Loading embedding models...")
 
     # Dense embeddings
-    dense_model = TextEmbedding(config.embed_model_id)
+    dense_model = _get_dense(config.embed_model_id)
 
     # Sparse embeddings (BM25)
-    bm25_model = Bm25(model_name=config.sparse_model_id)
+    bm25_model = _get_bm25(config.sparse_model_id)
 
     # ColBERT embeddings
-    colbert_model = LateInteractionTextEmbedding(model_name=config.colbert_model_id)
+    colbert_model = _get_colbert(config.colbert_model_id)
 
     return dense_model, bm25_model, colbert_model
 
@@ -92,6 +138,12 @@ def fetch_sec_filing_text(
     Returns:
         Dictionary with text content and filing metadata
     """
+    key = hashlib.sha256(f"{ticker}|{form_type}|{section}".encode("utf-8")).hexdigest()
+    cache_path = SEC_CACHE_DIR / f"{key}.json"
+    if cache_path.exists():
+        print(f"Loading cached {form_type} section {section} for {ticker}")
+        return json.loads(cache_path.read_text(encoding="utf-8"))
+
     query_api, extractor_api = setup_sec_apis()
 
     try:
@@ -135,86 +187,138 @@ def fetch_sec_filing_text(
         }
 
         print(f"Successfully extracted {len(text_content)} characters")
-        return {"text": text_content, "metadata": filing_metadata}
+        filing_data = {"text": text_content, "metadata": filing_metadata}
+
+        SEC_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(filing_data), encoding="utf-8")
+        return filing_data
 
     except Exception as e:
         print(f"Error fetching SEC filing: {e}")
         return None
 
 
-def create_semantic_chunks(text_content: str, max_tokens: int = 384):
-    """
-    Create semantic chunks using clustering approach.
-    """
-    # Divide em parágrafos
-    paragraphs = [
-        p.strip() for p in text_content.split("\n") if len(p.strip().split()) > 10
+def split_paragraphs(text_content: str):
+    """Split text into stripped paragraphs of more than ten words"""
+    # strip uma vez; maxsplit para de contar na 11ª palavra
+    return [
+        p
+        for p in map(str.strip, text_content.split("\n"))
+        if len(p.split(None, 10)) > 10
     ]
 
-    # Gera embeddings para clustering
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    embeddings = model.encode(paragraphs)
 
-    # Clustering principal
-    clusterer = hdbscan.HDBSCAN(min_cluster_size=3, metric="euclidean")
-    labels = clusterer.fit_predict(embeddings)
+def cluster_labels(embeddings, n_jobs: int = -1):
+    """HDBSCAN labels for paragraph embeddings (-1 marks an orphan)"""
+    # Poucos pontos para clusterizar: todos viram órfãos
+    if len(embeddings) < 3:
+        return [-1] * len(embeddings)
+
+    # Clustering numa única passada; min_cluster_size=2 já agrupa os pares
+    # que antes eram recuperados re-clusterizando os órfãos
+    clusterer = hdbscan.HDBSCAN(
+        min_cluster_size=2,
+        cluster_selection_epsilon=0.3,
+        metric="euclidean",
+        algorithm="boruvka_kdtree",
+        core_dist_n_jobs=n_jobs,
+    )
+    return clusterer.fit_predict(embeddings)
 
-    # Agrupa clusters principais
-    from collections import defaultdict
 
-    clusters = defaultdict(list)
-    for i, label in enumerate(labels):
-        if label != -1:
-            clusters[f"cluster_{label}"].append(paragraphs[i])
-
-    cluster_chunks = {
-        cluster_id: "\n\n".join(pars) for cluster_id, pars in clusters.items()
-    }
+def create_semantic_chunks(text_content: str, max_tokens: int = 384):
+    """
+    Create semantic chunks using clustering approach.
+    """
+    # Divide em parágrafos; em seções gigantes, agrupa por cabeçalho de ITEM
+    # para clusterizar vários conjuntos pequenos em vez de um enorme
+    segments = [split_paragraphs(text_content)]
+    if len(segments[0]) > SEGMENT_PARAGRAPHS:
+        segments = [split_paragraphs(seg) for seg in HEADING_RE.split(text_content)]
+    paragraphs = [p for segment in segments for p in segment]
+
+    # Gera embeddings para clustering com o mesmo modelo denso da ingestão,
+    # normalizados: a distância euclidiana vira função monótona do cosseno
+    embeddings = np.array(list(_get_dense().passage_embed(paragraphs)))
+    if len(embeddings):
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    # Agrupa clusters (como índices de parágrafos); órfãos viram chunks individuais
+    from collections import defaultdict
 
-    # Processa órfãos
-    orphan_indices = [i for i, label in enumerate(labels) if label == -1]
-    if len(orphan_indices) > 1:
-        orphan_embeddings = embeddings[orphan_indices]
-        orphan_clusterer = hdbscan.HDBSCAN(min_cluster_size=2, metric="euclidean")
-        orphan_labels = orphan_clusterer.fit_predict(orphan_embeddings)
-
-        orphan_clusters = defaultdict(list)
-        for i, sublabel in enumerate(orphan_labels):
-            original_idx = orphan_indices[i]
-            if sublabel != -1:
-                orphan_clusters[f"orphan_cluster_{sublabel}"].append(
-                    paragraphs[original_idx]
+    offsets = np.cumsum([0] + [len(segment) for segment in segments])
+    segment_embeddings = [
+        embeddings[start:end] for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+    if len(segments) == 1:
+        segment_labels = [cluster_labels(segment_embeddings[0])]
+    else:
+        # Segmentos independentes: um processo por segmento, cada um com uma
+        # thread (forkserver, pois fork após o ONNX iniciar threads é inseguro)
+        with ProcessPoolExecutor(
+            max_workers=min(len(segments), os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("forkserver"),
+        ) as executor:
+            segment_labels = list(
+                executor.map(
+                    functools.partial(cluster_labels, n_jobs=1), segment_embeddings
                 )
-            else:
-                cluster_chunks[f"single_orphan_{i}"] = paragraphs[original_idx]
+            )
 
-        for cluster_id, pars in orphan_clusters.items():
-            cluster_chunks[cluster_id] = "\n\n".join(pars)
+    clusters = defaultdict(list)
+    for segment_id, (start, labels) in enumerate(zip(offsets, segment_labels)):
+        for i, label in enumerate(labels, int(start)):
+            if label != -1:
+                clusters[f"segment_{segment_id}_cluster_{label}"].append(i)
+            else:
+                clusters[f"single_orphan_{i}"].append(i)
+
+    # Todo token tem ao menos um byte: clusters cujo tamanho em bytes UTF-8
+    # (mais um por separador "\n\n") já cabe em max_tokens dispensam tokenização
+    para_bytes = [len(p.encode("utf-8")) for p in paragraphs]
+    fitting = {
+        cluster_id
+        for cluster_id, indices in clusters.items()
+        if sum(para_bytes[i] for i in indices) + len(indices) - 1 <= max_tokens
+    }
 
-    # Chunking com tiktoken
-    tokenizer = tiktoken.encoding_for_model("gpt-4o")
+    # Chunking com tiktoken: os demais parágrafos são tokenizados uma única vez
+    # e o texto só é unido ao emitir o chunk
+    to_count = [
+        i
+        for cluster_id, indices in clusters.items()
+        if cluster_id not in fitting
+        for i in indices
+    ]
+    para_token_counts = dict(
+        zip(
+            to_count,
+            (len(t) for t in TOKENIZER.encode_batch([paragraphs[i] for i in to_count])),
+        )
+    )
     final_chunks = []
 
-    for cluster_id, text in cluster_chunks.items():
-        tokens = tokenizer.encode(text)
-
-        if len(tokens) <= max_tokens:
-            final_chunks.append({"text": text})
+    for cluster_id, indices in clusters.items():
+        # Soma dos parágrafos mais um token por separador "\n\n"
+        if (
+            cluster_id in fitting
+            or sum(para_token_counts[i] for i in indices) + len(indices) - 1
+            <= max_tokens
+        ):
+            final_chunks.append({"text": "\n\n".join(paragraphs[i] for i in indices)})
         else:
             # Divide o cluster
-            paragraphs_list = text.split("\n\n")
             current_chunk = []
             current_tokens = 0
 
-            for para in paragraphs_list:
-                para_tokens = len(tokenizer.encode(para))
-
+            for i in indices:
+                para_tokens = para_token_counts[i]
                 if current_tokens + para_tokens > max_tokens and current_chunk:
                     final_chunks.append({"text": "\n\n".join(current_chunk)})
-                    current_chunk = [para]
+                    current_chunk = [paragraphs[i]]
                     current_tokens = para_tokens
                 else:
-                    current_chunk.append(para)
+                    current_chunk.append(paragraphs[i])
                     current_tokens += para_tokens
 
             if current_chunk:
@@ -223,42 +327,73 @@ def create_semantic_chunks(text_content: str, max_tokens: int = 384):
     return final_chunks
 
 
-def create_embeddings(chunk_text, dense_model, bm25_model, colbert_model):
+def trim_padding(colbert_matrix):
     """
-    Create the three types of embeddings for a text chunk.
+    Drop the zero rows ColBERT appends for padded tokens in a batch.
+    A document's last real token ([SEP]) is never zeroed, so this restores
+    the same multivector it gets when embedded alone.
     """
-    # Generate embeddings for each model
-    dense_embedding = list(dense_model.passage_embed([chunk_text]))[0].tolist()
-    sparse_embedding = list(bm25_model.passage_embed([chunk_text]))[0].as_object()
-    colbert_embedding = list(colbert_model.passage_embed([chunk_text]))[0].tolist()
-
-    return {
-        "dense": dense_embedding,
-        "sparse": sparse_embedding,
-        "colbertv2.0": colbert_embedding,
-    }
+    nonzero_rows = np.flatnonzero(np.abs(colbert_matrix).sum(axis=1))
+    if len(nonzero_rows) == 0:
+        return colbert_matrix
+    return colbert_matrix[: nonzero_rows[-1] + 1]
 
 
-def prepare_point(chunk, filing_metadata, embedding_models):
+def create_embeddings(texts, dense_model, bm25_model, colbert_model, batch_size=32):
     """
-    Prepare a single data point for Qdrant ingestion.
+    Create the three types of embeddings for a list of text chunks.
     """
-    dense_model, bm25_model, colbert_model = embedding_models
+    # Sort by length so each batch holds similar-sized texts (less padding);
+    # results are put back in the original order
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    sorted_texts = [texts[i] for i in order]
+
+    # ONNX releases the GIL, so dense and ColBERT encode on worker threads
+    # while the pure-Python BM25 pass runs here
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        dense_future = executor.submit(
+            lambda: list(dense_model.passage_embed(sorted_texts, batch_size=batch_size))
+        )
+        colbert_future = executor.submit(
+            lambda: list(
+                colbert_model.passage_embed(sorted_texts, batch_size=batch_size)
+            )
+        )
+        sparse_embeddings = list(
+            bm25_model.passage_embed(sorted_texts, batch_size=batch_size)
+        )
+        dense_embeddings = dense_future.result()
+        colbert_embeddings = colbert_future.result()
+
+    embeddings = [None] * len(texts)
+    for i, dense, sparse, colbert in zip(
+        order, dense_embeddings, sparse_embeddings, colbert_embeddings
+    ):
+        # Kept as float32 arrays; converted to lists only as each point is built
+        embeddings[i] = {
+            "dense": dense,
+            "sparse": sparse.as_object(),
+            "colbertv2.0": trim_padding(colbert),
+        }
+
+    return embeddings
+
 
+def prepare_point(chunk, filing_metadata, embeddings):
+    """
+    Prepare a single data point for Qdrant ingestion.
+    """
     # Extract text from chunk
     text = chunk.get("text", "")
 
     try:
-        # Create embeddings
-        embeddings = create_embeddings(text, dense_model, bm25_model, colbert_model)
-
         # Create point with your requested metadata
         point = PointStruct(
             id=str(uuid.uuid4()),
             vector={
-                "dense": embeddings["dense"],
+                "dense": embeddings["dense"].tolist(),
                 "sparse": embeddings["sparse"],
-                "colbertv2.0": embeddings["colbertv2.0"],
+                "colbertv2.0": embeddings["colbertv2.0"].tolist(),
             },
             payload={
                 "text": text,
@@ -281,27 +416,42 @@ def prepare_point(chunk, filing_metadata, embedding_models):
 def upload_in_batches(
     client: QdrantClient,
     collection_name: str,
-    points: List[PointStruct],
-    batch_size: int = 10,
+    points: Iterable[PointStruct],
+    total: int,
+    batch_size: int = 32,
+    parallel: int = 4,
 ):
     """
     Upload points to Qdrant in batches with progress tracking.
+    points may be a generator - the client's uploader consumes it lazily,
+    spreading batches over parallel worker processes and retrying failures.
     """
-    # Calculate number of batches
-    n_batches = (len(points) + batch_size - 1) // batch_size
+    print(f"Uploading {total} points to collection '{collection_name}'...")
 
-    print(
-        f"Uploading {len(points)} points to collection '{collection_name}' in {n_batches} batches..."
+    # Defer HNSW indexing to a single pass once every point is in
+    optimizer_config = client.get_collection(collection_name).config.optimizer_config
+    client.update_collection(
+        collection_name=collection_name,
+        optimizer_config=OptimizersConfigDiff(indexing_threshold=0),
     )
 
-    # Process each batch with progress bar
-    for i in tqdm(range(0, len(points), batch_size), total=n_batches):
-        batch = points[i : i + batch_size]
-        client.upload_points(collection_name=collection_name, points=batch)
+    try:
+        client.upload_points(
+            collection_name=collection_name,
+            points=tqdm(points, total=total),
+            batch_size=batch_size,
+            parallel=parallel,
+        )
+    finally:
+        client.update_collection(
+            collection_name=collection_name,
+            optimizer_config=OptimizersConfigDiff(
+                indexing_threshold=optimizer_config.indexing_threshold
+                or DEFAULT_INDEXING_THRESHOLD
+            ),
+        )
 
-    print(
-        f"Successfully uploaded {len(points)} points to collection '{collection_name}'"
-    )
+    print(f"Successfully uploaded {total} points to collection '{collection_name}'")
 
 
 def process_and_ingest_filing(
@@ -346,41 +496,46 @@ def process_and_ingest_filing(
 
     # Step 5: Process and ingest chunks
     print("Processing and ingesting chunks...")
-    points = []
 
-    for i, chunk in enumerate(chunks):
-        print(f"Processing chunk {i + 1}/{len(chunks)}")
-
-        # Convert chunk to dict format if needed
-        if hasattr(chunk, "text"):
-            chunk_dict = {"text": chunk.text}
-        else:
-            chunk_dict = chunk
+    # Convert chunks to dict format if needed
+    chunk_dicts = [
+        {"text": chunk.text} if hasattr(chunk, "text") else chunk for chunk in chunks
+    ]
 
-        point = prepare_point(chunk_dict, filing_metadata, embedding_models)
-        if point:
-            points.append(point)
+    # Embed every chunk of the filing in batched model calls
+    print(f"Embedding {len(chunk_dicts)} chunks...")
+    try:
+        embeddings = create_embeddings(
+            [chunk.get("text", "") for chunk in chunk_dicts], *embedding_models
+        )
+    except Exception as e:
+        print(f"Error creating embeddings: {e}")
+        return False
 
-    if not points:
+    if not chunk_dicts:
         print("No valid points to ingest")
         return False
 
+    # Points are built as the uploader asks for them, never held all at once
+    points = (
+        point
+        for chunk_dict, chunk_embeddings in zip(chunk_dicts, embeddings)
+        if (point := prepare_point(chunk_dict, filing_metadata, chunk_embeddings))
+    )
+
     # Step 6: Ingest to Qdrant
-    print(f"Ingesting {len(points)} points to Qdrant...")
+    print(f"Ingesting {len(chunk_dicts)} points to Qdrant...")
     try:
-        # Get collection name from environment
-        load_dotenv()
-        collection_name = os.getenv("COLLECTION_NAME")
-
         upload_in_batches(
             client=qdrant_client,
-            collection_name=collection_name,
+            collection_name=COLLECTION_NAME,
             points=points,
-            batch_size=4,  # Adjust based on your document size and memory constraints
+            total=len(chunk_dicts),
+            batch_size=32,  # Adjust based on your document size and memory constraints
         )
 
         # qdrant_client.upsert(collection_name=collection_name, points=points)
-        print(f"Successfully ingested {len(points)} chunks to Qdrant")
+        print(f"Successfully ingested {len(chunk_dicts)} chunks to Qdrant")
         return True
 
     except Exception as e:
@@ -388,14 +543,17 @@ def process_and_ingest_filing(
         return False
 
 
-# Configuration
-ticker = "AAPL"
-form_type = "10-Q"
-section = "part2item1a"  # Risk Factors
+# Guarded so the uploader's worker processes, which re-import this script,
+# don't run the pipeline again
+if __name__ == "__main__":
+    # Configuration
+    ticker = "AAPL"
+    form_type = "10-Q"
+    section = "part2item1a"  # Risk Factors
 
-config = ProcessingConfig()
+    config = ProcessingConfig()
 
-# Run the pipeline
-process_and_ingest_filing(
-    ticker=ticker, form_type=form_type, section=section, config=config
-)
+    # Run the pipeline
+    process_and_ingest_filing(
+        ticker=ticker, form_type=form_type, section=section, config=config
+    )
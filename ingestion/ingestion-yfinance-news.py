@@ -1,7 +1,14 @@
 import os
+import json
 import uuid
+import hashlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import tiktoken
+import numpy as np
 from tqdm.auto import tqdm
+from typing import Iterable
+from pathlib import Path
 from dotenv import load_dotenv
 
 # News scraping
@@ -10,7 +17,7 @@ import trafilatura
 
 # Qdrant
 from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, List
+from qdrant_client.models import OptimizersConfigDiff, PointStruct
 
 # Embeddings
 from fastembed.sparse.bm25 import Bm25
@@ -23,41 +30,101 @@ EMBED_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
 SPARSE_MODEL_ID = "Qdrant/bm25"
 COLBERT_MODEL_ID = "colbert-ir/colbertv2.0"
 MAX_TOKENS = 384
+COLLECTION_NAME = os.getenv("COLLECTION_NAME")
+# Extracted article text is kept here, keyed by URL
+NEWS_CACHE_DIR = Path(os.getenv("NEWS_CACHE_DIR", ".news_cache"))
+TOKENIZER = tiktoken.encoding_for_model("gpt-4o")
 
+# Indexing threshold restored after uploads when the server reports none (or 0,
+# left behind by an interrupted earlier run)
+DEFAULT_INDEXING_THRESHOLD = 20000
 
+# Run dense and ColBERT encoding on the GPU (requires onnxruntime-gpu)
+PROVIDERS = (
+    ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    if os.getenv("USE_CUDA", "").lower() in ("1", "true", "yes")
+    else None
+)
+
+
+@functools.lru_cache(maxsize=1)
 def setup_qdrant_client():
-    """Initialize Qdrant client"""
+    """Initialize Qdrant client once per process"""
     client = QdrantClient(
         url=os.getenv("QDRANT_URL"),
         api_key=os.getenv("QDRANT_API_KEY"),
+        # Opt-in protobuf instead of JSON for the bulky ColBERT multivectors;
+        # needs the Qdrant gRPC port reachable
+        prefer_grpc=os.getenv("INGESTION_PREFER_GRPC", "false").lower()
+        in ("1", "true", "yes"),
+        grpc_port=int(os.getenv("QDRANT_GRPC_PORT", "6334")),
     )
     return client
 
 
+@functools.lru_cache(maxsize=1)
+def _get_dense() -> TextEmbedding:
+    """Load the dense model once per process"""
+    return TextEmbedding(EMBED_MODEL_ID, providers=PROVIDERS)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_bm25() -> Bm25:
+    """Load the BM25 model once per process"""
+    return Bm25(model_name=SPARSE_MODEL_ID)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_colbert() -> LateInteractionTextEmbedding:
+    """Load the ColBERT model once per process"""
+    return LateInteractionTextEmbedding(
+        model_name=COLBERT_MODEL_ID, providers=PROVIDERS
+    )
+
+
 def setup_embedding_models():
     """Initialize all embedding models"""
     print("Loading embedding models...")
 
     # Dense embeddings
-    dense_model = TextEmbedding(EMBED_MODEL_ID)
+    dense_model = _get_dense()
 
     # Sparse embeddings (BM25)
-    bm25_model = Bm25(model_name=SPARSE_MODEL_ID)
+    bm25_model = _get_bm25()
 
     # ColBERT embeddings
-    colbert_model = LateInteractionTextEmbedding(model_name=COLBERT_MODEL_ID)
+    colbert_model = _get_colbert()
 
     return dense_model, bm25_model, colbert_model
 
 
-def fetch_news_data(ticker: str, max_stories: int = 10):
+def fetch_article(candidate):
+    """Download a news story and extract its text, or None on failure"""
+    key = hashlib.sha256(candidate["url"].encode("utf-8")).hexdigest()
+    cache_path = NEWS_CACHE_DIR / f"{key}.json"
+    if cache_path.exists():
+        return {**candidate, "text": json.loads(cache_path.read_text(encoding="utf-8"))}
+
+    downloaded = trafilatura.fetch_url(candidate["url"])
+    text_content = trafilatura.extract(downloaded)
+
+    if not text_content:
+        return None
+
+    NEWS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cache_path.write_text(json.dumps(text_content), encoding="utf-8")
+    return {**candidate, "text": text_content}
+
+
+def fetch_news_data(ticker: str, max_stories: int = 10, max_workers: int = 8):
     """Fetch news data from Yahoo Finance"""
     print(f"Fetching news for {ticker}...")
 
     dat = yf.Ticker(ticker)
     news = dat.news
 
-    news_data = []
+    candidates = []
+    seen_urls = set()
 
     for item in news[:max_stories]:
         content = item.get("content", {})
@@ -72,37 +139,43 @@ def fetch_news_data(ticker: str, max_stories: int = 10):
         date = content.get("pubDate")
         url = canonical_url.get("url")
 
-        # Filter only Yahoo Finance links
-        if "finance.yahoo.com" not in url:
+        # Filter only Yahoo Finance links, each downloaded once
+        if not url or "finance.yahoo.com" not in url or url in seen_urls:
             continue
+        seen_urls.add(url)
 
-        # Extract article text
-        downloaded = trafilatura.fetch_url(url)
-        text_content = trafilatura.extract(downloaded)
+        candidates.append({"title": title, "url": url, "date": date})
 
-        if text_content:
-            news_data.append(
-                {"title": title, "url": url, "date": date, "text": text_content}
-            )
-            print(f"Extracted: {title}")
+    # Downloads are network bound - overlap them in a thread pool
+    news_data = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        articles = executor.map(fetch_article, candidates)
+        for article in tqdm(articles, total=len(candidates)):
+            if article:
+                news_data.append(article)
+                print(f"Extracted: {article['title']}")
 
     return news_data
 
 
 def create_text_chunks(text_content: str, max_tokens: int = MAX_TOKENS):
     """Create chunks based on token count only"""
-    tokenizer = tiktoken.encoding_for_model("gpt-4o")
-
     # Split text into paragraphs
     paragraphs = [p.strip() for p in text_content.split("\n") if p.strip()]
 
+    # Every token is at least one UTF-8 byte, so an article this short is one
+    # chunk without tokenizing it
+    if sum(len(p.encode("utf-8")) for p in paragraphs) <= max_tokens:
+        return ["\n\n".join(paragraphs)] if paragraphs else []
+
+    # Count tokens for all paragraphs in one native call
+    token_counts = [len(tokens) for tokens in TOKENIZER.encode_batch(paragraphs)]
+
     chunks = []
     current_chunk = []
     current_tokens = 0
 
-    for para in paragraphs:
-        para_tokens = len(tokenizer.encode(para))
-
+    for para, para_tokens in zip(paragraphs, token_counts):
         if current_tokens + para_tokens > max_tokens and current_chunk:
             chunks.append("\n\n".join(current_chunk))
             current_chunk = [para]
@@ -117,36 +190,64 @@ def create_text_chunks(text_content: str, max_tokens: int = MAX_TOKENS):
     return chunks
 
 
-def create_embeddings(chunk_text, dense_model, bm25_model, colbert_model):
-    """Create the three types of embeddings for a text chunk"""
-    dense_embedding = list(dense_model.passage_embed([chunk_text]))[0].tolist()
-    sparse_embedding = list(bm25_model.passage_embed([chunk_text]))[0].as_object()
-    colbert_embedding = list(colbert_model.passage_embed([chunk_text]))[0].tolist()
+def trim_padding(colbert_matrix):
+    """Drop the zero rows ColBERT appends for padded tokens in a batch"""
+    # A document's last real token ([SEP]) is never zeroed, so this restores
+    # the same multivector it gets when embedded alone
+    nonzero_rows = np.flatnonzero(np.abs(colbert_matrix).sum(axis=1))
+    if len(nonzero_rows) == 0:
+        return colbert_matrix
+    return colbert_matrix[: nonzero_rows[-1] + 1]
+
+
+def create_embeddings(texts, dense_model, bm25_model, colbert_model, batch_size=32):
+    """Create the three types of embeddings for a list of text chunks"""
+    # Sort by length so each batch holds similar-sized texts (less padding);
+    # results are put back in the original order
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    sorted_texts = [texts[i] for i in order]
+
+    # ONNX releases the GIL, so dense and ColBERT encode on worker threads
+    # while the pure-Python BM25 pass runs here
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        dense_future = executor.submit(
+            lambda: list(dense_model.passage_embed(sorted_texts, batch_size=batch_size))
+        )
+        colbert_future = executor.submit(
+            lambda: list(
+                colbert_model.passage_embed(sorted_texts, batch_size=batch_size)
+            )
+        )
+        sparse_embeddings = list(
+            bm25_model.passage_embed(sorted_texts, batch_size=batch_size)
+        )
+        dense_embeddings = dense_future.result()
+        colbert_embeddings = colbert_future.result()
 
-    return {
-        "dense": dense_embedding,
-        "sparse": sparse_embedding,
-        "colbertv2.0": colbert_embedding,
-    }
+    embeddings = [None] * len(texts)
+    for i, dense, sparse, colbert in zip(
+        order, dense_embeddings, sparse_embeddings, colbert_embeddings
+    ):
+        # Kept as float32 arrays; converted to lists only as each point is built
+        embeddings[i] = {
+            "dense": dense,
+            "sparse": sparse.as_object(),
+            "colbertv2.0": trim_padding(colbert),
+        }
 
+    return embeddings
 
-def prepare_news_point(chunk_text, news_metadata, ticker, embedding_models):
-    """Prepare a single data point for Qdrant ingestion"""
-    dense_model, bm25_model, colbert_model = embedding_models
 
+def prepare_news_point(chunk_text, news_metadata, ticker, embeddings):
+    """Prepare a single data point for Qdrant ingestion"""
     try:
-        # Create embeddings
-        embeddings = create_embeddings(
-            chunk_text, dense_model, bm25_model, colbert_model
-        )
-
         # Create point
         point = PointStruct(
             id=str(uuid.uuid4()),
             vector={
-                "dense": embeddings["dense"],
+                "dense": embeddings["dense"].tolist(),
                 "sparse": embeddings["sparse"],
-                "colbertv2.0": embeddings["colbertv2.0"],
+                "colbertv2.0": embeddings["colbertv2.0"].tolist(),
             },
             payload={
                 "text": chunk_text,
@@ -170,27 +271,42 @@ def prepare_news_point(chunk_text, news_metadata, ticker, embedding_models):
 def upload_in_batches(
     client: QdrantClient,
     collection_name: str,
-    points: List[PointStruct],
-    batch_size: int = 10,
+    points: Iterable[PointStruct],
+    total: int,
+    batch_size: int = 32,
+    parallel: int = 4,
 ):
     """
     Upload points to Qdrant in batches with progress tracking.
+    points may be a generator - the client's uploader consumes it lazily,
+    spreading batches over parallel worker processes and retrying failures.
     """
-    # Calculate number of batches
-    n_batches = (len(points) + batch_size - 1) // batch_size
+    print(f"Uploading {total} points to collection '{collection_name}'...")
 
-    print(
-        f"Uploading {len(points)} points to collection '{collection_name}' in {n_batches} batches..."
+    # Defer HNSW indexing to a single pass once every point is in
+    optimizer_config = client.get_collection(collection_name).config.optimizer_config
+    client.update_collection(
+        collection_name=collection_name,
+        optimizer_config=OptimizersConfigDiff(indexing_threshold=0),
     )
 
-    # Process each batch with progress bar
-    for i in tqdm(range(0, len(points), batch_size), total=n_batches):
-        batch = points[i : i + batch_size]
-        client.upload_points(collection_name=collection_name, points=batch)
+    try:
+        client.upload_points(
+            collection_name=collection_name,
+            points=tqdm(points, total=total),
+            batch_size=batch_size,
+            parallel=parallel,
+        )
+    finally:
+        client.update_collection(
+            collection_name=collection_name,
+            optimizer_config=OptimizersConfigDiff(
+                indexing_threshold=optimizer_config.indexing_threshold
+                or DEFAULT_INDEXING_THRESHOLD
+            ),
+        )
 
-    print(
-        f"Successfully uploaded {len(points)} points to collection '{collection_name}'"
-    )
+    print(f"Successfully uploaded {total} points to collection '{collection_name}'")
 
 
 def process_and_ingest_news(ticker: str, max_stories: int = 10):
@@ -207,8 +323,8 @@ def process_and_ingest_news(ticker: str, max_stories: int = 10):
     embedding_models = setup_embedding_models()
     qdrant_client = setup_qdrant_client()
 
-    # Step 3: Process each news article
-    all_points = []
+    # Step 3: Chunk each news article
+    article_chunks = []
 
     for news_item in news_data:
         print(f"Processing: {news_item['title']}")
@@ -217,23 +333,39 @@ def process_and_ingest_news(ticker: str, max_stories: int = 10):
         chunks = create_text_chunks(news_item["text"])
         print(f"Created {len(chunks)} chunks")
 
-        # Process each chunk
-        for chunk_text in chunks:
-            point = prepare_news_point(chunk_text, news_item, ticker, embedding_models)
-            if point:
-                all_points.append(point)
+        article_chunks.extend((chunk_text, news_item) for chunk_text in chunks)
 
-    # Step 4: Ingest to Qdrant
-    if all_points:
-        collection_name = os.getenv("COLLECTION_NAME")
+    # Embed the chunks of all articles in batched model calls
+    try:
+        embeddings = create_embeddings(
+            [chunk_text for chunk_text, _ in article_chunks], *embedding_models
+        )
+    except Exception as e:
+        print(f"Error creating embeddings: {e}")
+        return False
+
+    # Step 4: Ingest to Qdrant, building points as the uploader asks for them
+    if article_chunks:
+        all_points = (
+            point
+            for (chunk_text, news_item), chunk_embeddings in zip(
+                article_chunks, embeddings
+            )
+            if (
+                point := prepare_news_point(
+                    chunk_text, news_item, ticker, chunk_embeddings
+                )
+            )
+        )
         upload_in_batches(
             client=qdrant_client,
-            collection_name=collection_name,
+            collection_name=COLLECTION_NAME,
             points=all_points,
-            batch_size=4,
+            total=len(article_chunks),
+            batch_size=32,
         )
         print(
-            f"Successfully ingested {len(all_points)} chunks from {len(news_data)} articles"
+            f"Successfully ingested {len(article_chunks)} chunks from {len(news_data)} articles"
         )
         return True
     else:
@@ -241,9 +373,12 @@ def process_and_ingest_news(ticker: str, max_stories: int = 10):
         return False
 
 
-# Configuration and execution
-ticker = "AAPL"
-max_stories = 10
+# Guarded so the uploader's worker processes, which re-import this script,
+# don't run the pipeline again
+if __name__ == "__main__":
+    # Configuration and execution
+    ticker = "AAPL"
+    max_stories = 10
 
-# Run the pipeline
-process_and_ingest_news(ticker=ticker, max_stories=max_stories)
+    # Run the pipeline
+    process_and_ingest_news(ticker=ticker, max_stories=max_stories)
@@ -0,0 +1,63 @@
+import unittest
+from unittest import mock
+from qdrant_client import grpc
+from app.config.settings import Settings
+from app.models.embeddings import QueryEmbeddings, SparseVector
+from app.services.retriever import QdrantRetriever
+
+EMBEDDINGS = QueryEmbeddings(
+    dense=[0.1, 0.2, 0.3],
+    sparse_bm25=SparseVector(indices=[1, 7], values=[0.5, 1.5]),
+    late=[[0.1, 0.2], [0.3, 0.4]],
+)
+
+
+class GrpcSearchTest(unittest.TestCase):
+    """Searches must survive qdrant-client's REST to gRPC request conversion"""
+
+    def setUp(self):
+        settings = Settings(
+            qdrant_url="http://localhost:6333",
+            qdrant_prefer_grpc=True,
+            collection_name="test",
+        )
+        self.retriever = QdrantRetriever(settings=settings)
+
+        # Stand in for the gRPC points service; the request is still built
+        # from the converted protobuf messages
+        self.points = mock.Mock()
+        self.points.Query.return_value = grpc.QueryResponse()
+        self.points.QueryBatch.return_value = grpc.QueryBatchResponse(
+            result=[grpc.BatchResult()]
+        )
+        self.retriever.client._client._grpc_points_client = self.points
+
+    def tearDown(self):
+        self.retriever.close()
+
+    def test_search_documents(self):
+        documents = self.retriever.search_documents(
+            EMBEDDINGS, limit=3, filters={"ticker": "AAPL"}
+        )
+
+        self.assertEqual(documents, [])
+        request = self.points.Query.call_args.args[0]
+        self.assertEqual(len(request.prefetch), 2)
+        self.assertTrue(request.prefetch[0].params.quantization.rescore)
+        self.assertEqual(request.prefetch[1].using, "sparse")
+        self.assertEqual(request.filter.must[0].field.key, "metadata.ticker")
+        self.assertEqual(request.filter.must[0].field.match.keyword, "AAPL")
+
+    def test_search_documents_batch(self):
+        results = self.retriever.search_documents_batch(
+            [EMBEDDINGS], limit=3, filters={"ticker": "AAPL", "formType": "10-K"}
+        )
+
+        self.assertEqual(results, [[]])
+        request = self.points.QueryBatch.call_args.args[0].query_points[0]
+        self.assertEqual(len(request.prefetch), 2)
+        self.assertEqual(len(request.filter.must), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,8 +4,10 @@ Script to pre-download embedding models.
 Used during Docker build to cache models.
 """
 
+import importlib.util
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
@@ -15,6 +17,11 @@ def download_models():
     # Disable tokenizer parallelism to prevent issues
     os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+    # Use the multi-connection downloader when hf_transfer is installed
+    # (the hub refuses to start if the flag is set without it)
+    if importlib.util.find_spec("hf_transfer") is not None:
+        os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
     # Cache directory (can be overridden by environment variable)
     cache_dir = os.getenv("EMBEDDER_CACHE_DIR", "/tmp/vector")
 
@@ -31,15 +38,19 @@ def download_models():
         from fastembed.sparse.bm25 import Bm25
         from fastembed.late_interaction import LateInteractionTextEmbedding
 
-        # Download models
-        print("Downloading dense embedding model...")
-        TextEmbedding("sentence-transformers/all-MiniLM-L6-v2", cache_dir=cache_dir)
-
-        print("Downloading BM25 sparse model...")
-        Bm25("Qdrant/bm25", cache_dir=cache_dir)
-
-        print("Downloading late interaction model...")
-        LateInteractionTextEmbedding("colbert-ir/colbertv2.0", cache_dir=cache_dir)
+        # Download models concurrently - each one is bound by network I/O
+        downloads = {
+            "dense embedding": lambda: TextEmbedding(
+                "sentence-transformers/all-MiniLM-L6-v2", cache_dir=cache_dir
+            ),
+            "BM25 sparse": lambda: Bm25("Qdrant/bm25", cache_dir=cache_dir),
+            "late interaction": lambda: LateInteractionTextEmbedding(
+                "colbert-ir/colbertv2.0", cache_dir=cache_dir
+            ),
+        }
+        print(f"Downloading {', '.join(downloads)} models...")
+        with ThreadPoolExecutor(max_workers=len(downloads)) as executor:
+            list(executor.map(lambda download: download(), downloads.values()))
 
         print("All models downloaded successfully!")
         return True
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Script to profile one complete investment analysis.
+Run it under Scalene to attribute await time to each analysis stream:
+
+    scalene --async --cli --outfile profile.json utils/profile_analysis.py AAPL
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Make the app package importable when run from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+async def profile_analysis(ticker: str):
+    """Run the agent pipeline once for ticker, outside of FastAPI"""
+    from app.config.settings import get_settings
+    from app.services.agent_service import AgentService
+    from app.services.embedder import get_query_embedder_for_settings
+    from app.services.retriever import QdrantRetriever
+
+    settings = get_settings()
+    embedder = get_query_embedder_for_settings(settings)
+    embedder.warmup()
+
+    agent_service = AgentService(
+        embedder=embedder,
+        retriever=QdrantRetriever(settings=settings),
+        settings=settings,
+    )
+    return await agent_service.analyze_investment(ticker=ticker)
+
+
+if __name__ == "__main__":
+    ticker = sys.argv[1] if len(sys.argv) > 1 else "AAPL"
+
+    try:
+        result = asyncio.run(profile_analysis(ticker))
+        print(f"Analysis for {result.ticker} completed in {result.execution_time:.2f}s")
+        print(f"Recommendation: {result.final_recommendation.action}")
+    except Exception as e:
+        print(f"Error during analysis: {e}")
+        sys.exit(1)